@@ -7,6 +7,7 @@ from .models import (
     FileType,
     Event,
     User,
+    WebhookDelivery,
 )
 
 admin.site.register(FileDoc)
@@ -14,6 +15,13 @@ admin.site.register(FileType)
 admin.site.register(Event)
 
 
+@admin.register(WebhookDelivery)
+class WebhookDeliveryAdmin(admin.ModelAdmin):
+    list_display = ('id', 'action', 'state', 'attempts', 'available_at', 'created')
+    list_filter = ('state', 'action')
+    readonly_fields = ('payload', 'internal', 'last_error', 'created', 'processed_at')
+
+
 @admin.register(User)
 class UserAdmin(DjangoUserAdmin):
     """Define admin model for custom User model with no email field."""
@@ -1,6 +1,95 @@
+import os
+
 from post_registration.settings import get_env_variable
 
 # Webhook related settings
 URL_LOCAL = get_env_variable('URL_LOCAL')
 URL_ENDPOINT = URL_LOCAL + '/webhook-point/'
-WH_ACTIONS = 'order.placed'
+SNAPSHOT_WH_ACTIONS = ('event.updated', 'venue.updated')
+EVENTBRITE_WH_ACTIONS = ('order.placed',) + SNAPSHOT_WH_ACTIONS
+WH_ACTIONS = ','.join(EVENTBRITE_WH_ACTIONS)
+
+# Eventbrite event cache settings
+EVENT_CACHE_ALIAS = 'eventbrite'
+CONTROL_CACHE_ALIAS = 'control'
+EVENT_CACHE_TTL = int(os.environ.get('EVENT_CACHE_TTL', 300))
+EVENT_CACHE_MAX_SIZE = int(os.environ.get('EVENT_CACHE_MAX_SIZE', 1024))
+# Coalesce cache misses across workers through a lock in the shared cache
+EVENT_CACHE_SHARED_LOCK = os.environ.get('EVENT_CACHE_SHARED_LOCK', 'true').lower() == 'true'
+EVENT_CACHE_LOCK_TIMEOUT = float(os.environ.get('EVENT_CACHE_LOCK_TIMEOUT', 10))
+EVENT_CACHE_LOCK_POLL = 0.05
+
+# Upper bound of concurrent Eventbrite requests issued by a single page
+EVENTBRITE_MAX_WORKERS = int(os.environ.get('EVENTBRITE_MAX_WORKERS', 8))
+
+# Organizer event listings
+EVENTS_LIST_LIMIT = int(os.environ.get('EVENTS_LIST_LIMIT', 200))
+EVENTS_LIST_ORDER = 'start_desc'
+
+# The Eventbrite SDK reads the same variable; point it at a local stand-in
+# to replay webhook journals without calling Eventbrite
+EVENTBRITE_API_URL = os.environ.get('EVENTBRITE_API_URL', 'https://www.eventbriteapi.com/v3/')
+
+# Pooled Eventbrite HTTP clients, one keep-alive session per OAuth token
+EVENTBRITE_POOL_CONNECTIONS = int(os.environ.get('EVENTBRITE_POOL_CONNECTIONS', 10))
+EVENTBRITE_POOL_MAXSIZE = int(os.environ.get('EVENTBRITE_POOL_MAXSIZE', 10))
+EVENTBRITE_CLIENT_IDLE_TIMEOUT = int(os.environ.get('EVENTBRITE_CLIENT_IDLE_TIMEOUT', 300))
+
+# Local Eventbrite event snapshots
+EVENT_SNAPSHOT_MAX_AGE = int(os.environ.get('EVENT_SNAPSHOT_MAX_AGE', 3600))
+EVENT_SNAPSHOT_BATCH_SIZE = int(os.environ.get('EVENT_SNAPSHOT_BATCH_SIZE', 100))
+
+# Eventbrite rate limiting, shared by every worker through RateBucket rows
+EVENTBRITE_RATE_LIMIT = int(os.environ.get('EVENTBRITE_RATE_LIMIT', 2000))
+EVENTBRITE_RATE_PERIOD = int(os.environ.get('EVENTBRITE_RATE_PERIOD', 3600))
+EVENTBRITE_INTERACTIVE_RESERVE = int(os.environ.get('EVENTBRITE_INTERACTIVE_RESERVE', 200))
+EVENTBRITE_RATE_MAX_WAIT = float(os.environ.get('EVENTBRITE_RATE_MAX_WAIT', 5))
+EVENTBRITE_MAX_RETRIES = int(os.environ.get('EVENTBRITE_MAX_RETRIES', 3))
+EVENTBRITE_BACKOFF_BASE = float(os.environ.get('EVENTBRITE_BACKOFF_BASE', 0.5))
+EVENTBRITE_BACKOFF_MAX = float(os.environ.get('EVENTBRITE_BACKOFF_MAX', 30))
+
+# Eventbrite timeouts and circuit breaker
+EVENTBRITE_TIMEOUT = (
+    float(os.environ.get('EVENTBRITE_CONNECT_TIMEOUT', 3.05)),
+    float(os.environ.get('EVENTBRITE_READ_TIMEOUT', 10)),
+)
+EVENTBRITE_FAILURE_THRESHOLD = int(os.environ.get('EVENTBRITE_FAILURE_THRESHOLD', 5))
+EVENTBRITE_RESET_TIMEOUT = float(os.environ.get('EVENTBRITE_RESET_TIMEOUT', 30))
+EVENTBRITE_SLOW_CALL = float(os.environ.get('EVENTBRITE_SLOW_CALL', 5))
+
+# Webhook delivery queue, drained by the process_webhooks command
+WEBHOOK_QUEUE_BATCH_SIZE = int(os.environ.get('WEBHOOK_QUEUE_BATCH_SIZE', 50))
+WEBHOOK_QUEUE_CONCURRENCY = int(os.environ.get('WEBHOOK_QUEUE_CONCURRENCY', 4))
+WEBHOOK_MAX_ATTEMPTS = int(os.environ.get('WEBHOOK_MAX_ATTEMPTS', 5))
+WEBHOOK_RETRY_BASE = float(os.environ.get('WEBHOOK_RETRY_BASE', 30))
+WEBHOOK_RETRY_MAX = float(os.environ.get('WEBHOOK_RETRY_MAX', 3600))
+WEBHOOK_LOCK_TIMEOUT = int(os.environ.get('WEBHOOK_LOCK_TIMEOUT', 300))
+# Seconds a small batch waits so a burst of orders can share one batch
+WEBHOOK_BATCH_WINDOW = float(os.environ.get('WEBHOOK_BATCH_WINDOW', 0.5))
+
+# Importing the attendees of events adopted after tickets were sold
+ATTENDEES_IMPORT_ACTION = 'attendees.import'
+ATTENDEES_IMPORT_CHUNK_SIZE = int(os.environ.get('ATTENDEES_IMPORT_CHUNK_SIZE', 500))
+# First sweep window for events that were never reconciled, and how long
+# after an event ends its attendees are still reconciled
+ATTENDEES_RECONCILE_LOOKBACK = int(os.environ.get('ATTENDEES_RECONCILE_LOOKBACK', 86400))
+
+# Emailing attendees the results of an event, one batch per transaction
+RESULTS_PUBLISH_ACTION = 'results.publish'
+RESULTS_PUBLISH_BATCH_SIZE = int(os.environ.get('RESULTS_PUBLISH_BATCH_SIZE', 500))
+
+# Seconds the in-process index of organizer tokens is trusted
+ORGANIZER_TOKENS_TTL = int(os.environ.get('ORGANIZER_TOKENS_TTL', 300))
+
+# Admission control on webhook ingestion
+WEBHOOK_MAX_IN_FLIGHT = int(os.environ.get('WEBHOOK_MAX_IN_FLIGHT', 8))
+WEBHOOK_QUEUE_MAX_DEPTH = int(os.environ.get('WEBHOOK_QUEUE_MAX_DEPTH', 10000))
+WEBHOOK_QUEUE_DEPTH_TTL = float(os.environ.get('WEBHOOK_QUEUE_DEPTH_TTL', 5))
+WEBHOOK_BUSY_RETRY_AFTER = int(os.environ.get('WEBHOOK_BUSY_RETRY_AFTER', 5))
+WEBHOOK_FULL_RETRY_AFTER = int(os.environ.get('WEBHOOK_FULL_RETRY_AFTER', 60))
+WEBHOOK_METRICS_FLUSH = float(os.environ.get('WEBHOOK_METRICS_FLUSH', 10))
+
+# Outbound email outbox, drained by the send_emails command
+EMAIL_OUTBOX_BATCH_SIZE = int(os.environ.get('EMAIL_OUTBOX_BATCH_SIZE', 100))
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.environ.get('EMAIL_OUTBOX_MAX_ATTEMPTS', 5))
+EMAIL_OUTBOX_LOCK_TIMEOUT = int(os.environ.get('EMAIL_OUTBOX_LOCK_TIMEOUT', 300))
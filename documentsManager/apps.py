@@ -1,5 +1,12 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class DocumentsmanagerConfig(AppConfig):
     name = 'documentsManager'
+
+    def ready(self):
+        from social_django.models import UserSocialAuth
+        from .organizer_tokens import clear_organizer_tokens
+        post_save.connect(clear_organizer_tokens, sender=UserSocialAuth)
+        post_delete.connect(clear_organizer_tokens, sender=UserSocialAuth)
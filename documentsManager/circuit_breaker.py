@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+import time
+from threading import Lock
+
+
+class CircuitOpen(Exception):
+    pass
+
+
+class CircuitBreaker(object):
+    """
+    Opens after ``failure_threshold`` consecutive failed or slow calls and
+    lets a single trial call through once ``reset_timeout`` has elapsed.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold, reset_timeout, slow_call_threshold):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.slow_call_threshold = slow_call_threshold
+        self.lock = Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.opened_at = None
+
+    @property
+    def is_open(self):
+        with self.lock:
+            return self.state == self.OPEN and not self.can_retry()
+
+    def can_retry(self):
+        return time.time() - self.opened_at >= self.reset_timeout
+
+    def before_call(self):
+        with self.lock:
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.OPEN and self.can_retry():
+                self.state = self.HALF_OPEN
+                return
+            raise CircuitOpen('Eventbrite circuit is open')
+
+    def record(self, success, elapsed):
+        if elapsed > self.slow_call_threshold:
+            success = False
+        with self.lock:
+            if success:
+                self.state = self.CLOSED
+                self.failures = 0
+                return
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.time()
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+import re
+from threading import Lock
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.template import engines
+from django.template.loader import get_template
+from django.utils.html import strip_tags
+from pynliner import Pynliner
+
+_LOAD_INLINECSS = re.compile(r'{%\s*load\s+inlinecss\s*%}')
+_INLINECSS_BLOCK = re.compile(
+    r'{%\s*inlinecss\s+(?P<paths>.+?)\s*%}(?P<body>.*?){%\s*endinlinecss\s*%}',
+    re.DOTALL,
+)
+_LITERAL = re.compile(r'^(?P<quote>["\'])(?P<path>[^"\']+)(?P=quote)$')
+
+_compiled = {}
+_compiled_lock = Lock()
+
+
+def render_email(template_name, context):
+    # Returns (html, text). The stylesheet is inlined into the template
+    # source once per process, so each message only fills in its context.
+    html_template, text_template = get_email_template(template_name)
+    if text_template is None:
+        html = html_template.render(context)
+        return html, strip_tags(html)
+    return html_template.render(context), text_template.render(context)
+
+
+def get_email_template(template_name):
+    compiled = _compiled.get(template_name)
+    if compiled is None:
+        with _compiled_lock:
+            compiled = _compiled.get(template_name)
+            if compiled is None:
+                compiled = compile_email_template(template_name)
+                _compiled[template_name] = compiled
+    return compiled
+
+
+def clear_email_templates():
+    with _compiled_lock:
+        _compiled.clear()
+
+
+def compile_email_template(template_name):
+    template = get_template(template_name)
+    source = template.template.source
+    blocks = list(_INLINECSS_BLOCK.finditer(source))
+    if not blocks or not all(_css_paths(block) for block in blocks):
+        # Stylesheets named by a variable are only known at render time
+        return template, None
+    source = _INLINECSS_BLOCK.sub(
+        lambda block: _inline(block.group('body'), _css_paths(block)),
+        source,
+    )
+    source = _LOAD_INLINECSS.sub('', source)
+    engine = engines['django']
+    return engine.from_string(source), engine.from_string(strip_tags(source))
+
+
+def _css_paths(block):
+    paths = []
+    for argument in block.group('paths').split():
+        literal = _LITERAL.match(argument)
+        if literal is None:
+            return None
+        paths.append(literal.group('path'))
+    return paths
+
+
+def _inline(html, paths):
+    # Same lookup as django_inlinecss does on every render
+    css = ''
+    for path in paths:
+        if settings.DEBUG:
+            expanded_path = finders.find(path)
+        else:
+            expanded_path = staticfiles_storage.path(path)
+        with open(expanded_path) as css_file:
+            css += css_file.read()
+    return Pynliner().from_string(html).with_cssString(css).run()
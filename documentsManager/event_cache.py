@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+import time
+from threading import RLock
+
+from cachetools import TTLCache
+from django.core.cache import caches
+
+from .app_settings import (
+    CONTROL_CACHE_ALIAS,
+    EVENT_CACHE_ALIAS,
+    EVENT_CACHE_LOCK_POLL,
+    EVENT_CACHE_LOCK_TIMEOUT,
+    EVENT_CACHE_MAX_SIZE,
+    EVENT_CACHE_SHARED_LOCK,
+    EVENT_CACHE_TTL,
+)
+from .single_flight import SingleFlight
+
+EVENT_CACHE_KEY = 'eventbrite:event:{}'
+EVENT_LOCK_KEY = 'eventbrite:event-lock:{}'
+
+_local_events = TTLCache(maxsize=EVENT_CACHE_MAX_SIZE, ttl=EVENT_CACHE_TTL)
+_local_lock = RLock()
+_event_flight = SingleFlight()
+
+
+def event_cache_key(eb_event_id):
+    return EVENT_CACHE_KEY.format(eb_event_id)
+
+
+def get_shared_cache():
+    return caches[EVENT_CACHE_ALIAS]
+
+
+def get_control_cache():
+    return caches[CONTROL_CACHE_ALIAS]
+
+
+def is_cacheable(api_event):
+    return isinstance(api_event, dict) and 'id' in api_event
+
+
+def get_cached_event(eb_event_id, fetch):
+    """
+    Returns the Eventbrite event from the per-process LRU first, then from
+    the shared cache, calling ``fetch`` only when both of them miss.
+    Concurrent misses for the same event share a single ``fetch``.
+    """
+    key = event_cache_key(eb_event_id)
+    with _local_lock:
+        api_event = _local_events.get(key)
+    if api_event is not None:
+        return api_event
+    return _event_flight.do(key, lambda: load_event(eb_event_id, fetch))
+
+
+def load_event(eb_event_id, fetch):
+    key = event_cache_key(eb_event_id)
+    api_event = get_shared_cache().get(key)
+    if api_event is None:
+        if EVENT_CACHE_SHARED_LOCK:
+            api_event = fetch_with_shared_lock(eb_event_id, fetch)
+        else:
+            api_event = fetch_and_share(eb_event_id, fetch)
+        if not is_cacheable(api_event):
+            return api_event
+    with _local_lock:
+        _local_events[key] = api_event
+    return api_event
+
+
+def fetch_and_share(eb_event_id, fetch):
+    api_event = fetch()
+    if is_cacheable(api_event):
+        api_event = dict(api_event)
+        get_shared_cache().set(event_cache_key(eb_event_id), api_event, EVENT_CACHE_TTL)
+    return api_event
+
+
+def fetch_with_shared_lock(eb_event_id, fetch):
+    # Only the worker holding the lock calls Eventbrite, the others wait for
+    # its answer to show up in the shared cache.
+    lock_key = EVENT_LOCK_KEY.format(eb_event_id)
+    if get_control_cache().add(lock_key, 1, EVENT_CACHE_LOCK_TIMEOUT):
+        try:
+            return fetch_and_share(eb_event_id, fetch)
+        finally:
+            get_control_cache().delete(lock_key)
+    deadline = time.time() + EVENT_CACHE_LOCK_TIMEOUT
+    while time.time() < deadline:
+        time.sleep(EVENT_CACHE_LOCK_POLL)
+        api_event = get_shared_cache().get(event_cache_key(eb_event_id))
+        if api_event is not None:
+            return api_event
+        if get_control_cache().get(lock_key) is None:
+            break
+    return fetch_and_share(eb_event_id, fetch)
+
+
+def invalidate_event(eb_event_id):
+    """
+    Drops the event from the shared cache and from this process's LRU.
+    Other processes keep their own copy for up to EVENT_CACHE_TTL seconds,
+    so callers that need the current event must invalidate it themselves
+    right before fetching it, as select_event and store_event_snapshot do.
+    """
+    key = event_cache_key(eb_event_id)
+    with _local_lock:
+        _local_events.pop(key, None)
+    get_shared_cache().delete(key)
+
+
+def clear_event_cache():
+    with _local_lock:
+        _local_events.clear()
+    get_shared_cache().clear()
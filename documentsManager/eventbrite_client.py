@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+import time
+from threading import Lock
+
+import requests
+from eventbrite import Eventbrite
+from eventbrite.compat import json
+from eventbrite.decorators import objectify
+from eventbrite.exceptions import InternetConnectionError
+from eventbrite.utils import format_path
+from requests.adapters import HTTPAdapter
+
+from .app_settings import (
+    EVENTBRITE_CLIENT_IDLE_TIMEOUT,
+    EVENTBRITE_FAILURE_THRESHOLD,
+    EVENTBRITE_MAX_RETRIES,
+    EVENTBRITE_POOL_CONNECTIONS,
+    EVENTBRITE_POOL_MAXSIZE,
+    EVENTBRITE_RATE_MAX_WAIT,
+    EVENTBRITE_RESET_TIMEOUT,
+    EVENTBRITE_SLOW_CALL,
+    EVENTBRITE_TIMEOUT,
+)
+from .circuit_breaker import (
+    CircuitBreaker,
+    CircuitOpen,
+)
+from .rate_limit import (
+    RateLimited,
+    acquire,
+    backoff_delay,
+    exhaust,
+    is_background,
+    parse_retry_after,
+)
+
+
+class EventbriteServerError(Exception):
+
+    def __init__(self, status_code):
+        super(EventbriteServerError, self).__init__(
+            'Eventbrite answered {}'.format(status_code))
+        self.status_code = status_code
+
+
+class EventbriteResponseError(Exception):
+    # Eventbrite answered with an error payload instead of the resource
+
+    def __init__(self, response):
+        super(EventbriteResponseError, self).__init__('Eventbrite error {}: {}'.format(
+            response.get('status_code'),
+            response.get('error_description') or response.get('error'),
+        ))
+        self.response = response
+
+
+# Errors raised instead of a response whenever Eventbrite cannot be reached
+EVENTBRITE_UNAVAILABLE = (
+    CircuitOpen,
+    EventbriteServerError,
+    InternetConnectionError,
+    RateLimited,
+    requests.exceptions.Timeout,
+)
+
+RETRY_STATUSES = {
+    'get': (429, 500, 502, 503, 504),
+    'delete': (429, 500, 502, 503, 504),
+    'post': (429,),
+}
+
+
+class EventbriteClient(Eventbrite):
+    """
+    Eventbrite SDK client that sends every request through one pooled
+    keep-alive session instead of the module level ``requests`` calls.
+    """
+
+    def __init__(self, oauth_token, **kwargs):
+        super(EventbriteClient, self).__init__(oauth_token, **kwargs)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=EVENTBRITE_POOL_CONNECTIONS,
+            pool_maxsize=EVENTBRITE_POOL_MAXSIZE,
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.last_used = time.time()
+
+    @objectify
+    def get(self, path, data=None, expand=()):
+        headers = self.headers
+        headers.pop('content-type', None)
+        path = format_path(path, self.eventbrite_api_url)
+        data = dict(data or {})
+        if not data.get('expand'):
+            data['expand'] = ','.join(expand) if expand else 'none'
+        return self.send('get', path, headers=headers, params=data)
+
+    @objectify
+    def post(self, path, data=None):
+        path = format_path(path, self.eventbrite_api_url)
+        json_data = json.dumps(data or {})
+        return self.send('post', path, headers=self.headers, data=json_data)
+
+    @objectify
+    def delete(self, path, data=None):
+        path = format_path(path, self.eventbrite_api_url)
+        return self.send('delete', path, headers=self.headers, data=data or {})
+
+    def send(self, method, path, **kwargs):
+        # Throttled and failing calls raise once the retries run out, or as
+        # soon as the next wait would keep an interactive request past
+        # EVENTBRITE_RATE_MAX_WAIT; background jobs are retried by the queue.
+        kwargs.setdefault('timeout', EVENTBRITE_TIMEOUT)
+        background = is_background()
+        deadline = time.time() + EVENTBRITE_RATE_MAX_WAIT
+        attempt = 0
+        while True:
+            acquire(self.oauth_token, deadline)
+            response = self.request_through_breaker(method, path, **kwargs)
+            if response.status_code not in RETRY_STATUSES[method]:
+                return response
+            retry_after = parse_retry_after(response)
+            delay = backoff_delay(attempt, retry_after)
+            throttled = response.status_code == 429
+            if throttled:
+                exhaust(self.oauth_token)
+            if (attempt >= EVENTBRITE_MAX_RETRIES or
+                    (throttled and background) or
+                    (not background and time.time() + delay > deadline)):
+                if throttled:
+                    raise RateLimited(retry_after or delay)
+                raise EventbriteServerError(response.status_code)
+            time.sleep(delay)
+            attempt += 1
+
+    def request_through_breaker(self, method, path, **kwargs):
+        breaker.before_call()
+        started = time.time()
+        success = False
+        try:
+            response = self.session.request(method, path, **kwargs)
+            success = response.status_code < 500
+            return response
+        finally:
+            breaker.record(success, time.time() - started)
+
+    def close(self):
+        self.session.close()
+
+
+breaker = CircuitBreaker(
+    failure_threshold=EVENTBRITE_FAILURE_THRESHOLD,
+    reset_timeout=EVENTBRITE_RESET_TIMEOUT,
+    slow_call_threshold=EVENTBRITE_SLOW_CALL,
+)
+
+
+_clients = {}
+_clients_lock = Lock()
+
+
+def get_client(token):
+    now = time.time()
+    with _clients_lock:
+        evict_idle_clients(now)
+        client = _clients.get(token)
+        if client is None:
+            client = EventbriteClient(token)
+            _clients[token] = client
+        client.last_used = now
+    return client
+
+
+def evict_idle_clients(now):
+    # Callers must hold _clients_lock.
+    idle_tokens = [
+        token for token, client in _clients.items()
+        if now - client.last_used > EVENTBRITE_CLIENT_IDLE_TIMEOUT
+    ]
+    for token in idle_tokens:
+        _clients.pop(token).close()
+
+
+def close_clients():
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
@@ -1,12 +1,14 @@
 # -*- coding: utf-8 -*-
+import csv
 from datetime import datetime
 
 from django.contrib.auth.forms import UserCreationForm
-from django.core.mail import EmailMultiAlternatives
 from django.forms import (
+    CharField,
     CheckboxInput,
     CheckboxSelectMultiple,
     EmailField,
+    FileField,
     Form,
     ModelForm,
     ModelMultipleChoiceField,
@@ -16,10 +18,8 @@ from django.forms import (
     Textarea,
     DateInput,
     EmailInput,
+    ValidationError,
 )
-from django.template.base import logger
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
 from django.utils.translation import gettext_lazy as _
 
 from .models import (
@@ -34,7 +34,9 @@ from .models import (
     Result,
     Submission,
 )
+from .outbox import queue_message
 from .utils import (
+    evaluator_invitation_email,
     notify_attendee_from_attende_code,
     validate_files_submissions,
     validate_text_submissions,
@@ -193,6 +195,21 @@ class EvaluationDateForm(ModelForm):
         }
 
 
+class ReviewNotificationsForm(ModelForm):
+
+    class Meta:
+        model = Event
+        fields = [
+            'review_notifications',
+        ]
+        labels = {
+            'review_notifications': _('Notify me of reviews'),
+        }
+        widgets = {
+            'review_notifications': Select(attrs={'class': 'form-control'}),
+        }
+
+
 class SignUpForm(UserCreationForm):
     email = EmailField(required=True)
 
@@ -255,24 +272,7 @@ class EvaluatorForm(ModelForm):
 
     def send_email(self, form, event, accept_url, decline_url):
         email = form.cleaned_data['email']
-        invitation_code = EvaluatorEvent.objects.filter(
-            event=event['id']).values_list('invitation_code', flat=True)
-        FROM = 'kaizendev18@gmail.com'
-        TO = email
-        SUBJECT = 'Invitation to evaluate submissions for an event.'
-        html_content = render_to_string('email/evaluation_request.html', {
-            'event': event,
-            'invitation_code': invitation_code[0].hex,
-            'accept_url': accept_url,
-            'decline_url': decline_url,
-        })
-        text_content = strip_tags(html_content)
-        msg = EmailMultiAlternatives(SUBJECT, text_content, FROM, [TO])
-        msg.attach_alternative(html_content, "text/html")
-        try:
-            msg.send()
-        except Exception as e:
-            logger.exception(e)
+        queue_message(evaluator_invitation_email(email, event, accept_url, decline_url))
 
     def save(self, update=True, event_id=None):
         evaluator = super().save()
@@ -286,6 +286,56 @@ class EvaluatorForm(ModelForm):
         pass
 
 
+def parse_evaluator_rows(lines):
+    # Rows are "name,email" or just "email"; returns the valid (name, email)
+    # pairs and the (row, error) pairs that were rejected.
+    evaluators = []
+    invalid_rows = []
+    email_field = EmailField()
+    name_length = Evaluator._meta.get_field('name').max_length
+    for row in csv.reader(lines):
+        cells = [cell.strip() for cell in row if cell.strip()]
+        if not cells or [cell.lower() for cell in cells] == ['name', 'email']:
+            continue
+        if len(cells) == 1:
+            name, email = cells[0].split('@')[0], cells[0]
+        elif len(cells) == 2:
+            name, email = cells
+        else:
+            invalid_rows.append((','.join(row), 'Expected "name,email".'))
+            continue
+        try:
+            email = email_field.clean(email)
+        except ValidationError as error:
+            invalid_rows.append((','.join(row), error.messages[0]))
+            continue
+        evaluators.append((name[:name_length], email))
+    return evaluators, invalid_rows
+
+
+class EvaluatorBulkForm(Form):
+    evaluators = CharField(
+        required=False,
+        help_text='One evaluator per line: name,email',
+        widget=Textarea(attrs={'class': 'form-control', 'rows': 10}),
+    )
+    csv_file = FileField(required=False)
+
+    def clean(self):
+        cleaned_data = super(EvaluatorBulkForm, self).clean()
+        lines = (cleaned_data.get('evaluators') or '').splitlines()
+        csv_file = cleaned_data.get('csv_file')
+        if csv_file:
+            try:
+                lines += csv_file.read().decode('utf-8-sig').splitlines()
+            except UnicodeDecodeError:
+                raise ValidationError('The CSV file must be UTF-8 encoded.')
+        self.evaluators, self.invalid_rows = parse_evaluator_rows(lines)
+        if not self.evaluators and not self.invalid_rows:
+            raise ValidationError('Upload a CSV file or paste at least one evaluator.')
+        return cleaned_data
+
+
 class ReviewForm(ModelForm):
 
     class Meta:
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from documentsManager.webhook_journal import (
+    iter_journal,
+    write_journal,
+)
+
+
+class Command(BaseCommand):
+    help = 'Writes the received webhooks as a JSON lines journal for replay_webhooks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='ISO 8601 datetime, inclusive.')
+        parser.add_argument('--until', help='ISO 8601 datetime, exclusive.')
+        parser.add_argument('--output', '-o', help='Journal file, stdout by default.')
+
+    def handle(self, *args, **options):
+        since = self.parse(options['since'])
+        until = self.parse(options['until'])
+        records = iter_journal(since, until)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                written = write_journal(records, output)
+            self.stderr.write('Wrote {} webhooks to {}.'.format(written, options['output']))
+        else:
+            write_journal(records, sys.stdout)
+
+    def parse(self, value):
+        if value is None:
+            return None
+        parsed = parse_datetime(value)
+        if parsed is None:
+            raise CommandError('Invalid datetime: {}'.format(value))
+        return parsed
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+from django.core.management.base import BaseCommand
+
+from documentsManager.app_settings import (
+    ATTENDEES_IMPORT_CHUNK_SIZE,
+    URL_LOCAL,
+)
+from documentsManager.models import Event
+from documentsManager.rate_limit import background_requests
+from documentsManager.utils import import_event_attendees
+
+
+class Command(BaseCommand):
+    help = 'Creates and emails codes for the attendees that bought tickets before the event was adopted.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('event_id', nargs='+', type=int)
+        parser.add_argument('--chunk-size', type=int, default=ATTENDEES_IMPORT_CHUNK_SIZE)
+        parser.add_argument('--host', default=URL_LOCAL)
+
+    def handle(self, *args, **options):
+        for event in Event.objects.filter(id__in=options['event_id']).order_by('id'):
+            with background_requests():
+                imported = import_event_attendees(
+                    event,
+                    options['host'],
+                    chunk_size=options['chunk_size'],
+                )
+            self.stdout.write('Imported {} attendees for event {}.'.format(imported, event.id))
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from documentsManager.app_settings import (
+    WEBHOOK_BATCH_WINDOW,
+    WEBHOOK_QUEUE_BATCH_SIZE,
+    WEBHOOK_QUEUE_CONCURRENCY,
+)
+from documentsManager.rate_limit import background_requests
+from documentsManager.utils import (
+    get_data,
+    process_order_webhooks,
+    run_internal_job,
+)
+from documentsManager.webhook_queue import (
+    claim_deliveries,
+    process_delivery,
+    process_delivery_batch,
+)
+
+
+class Command(BaseCommand):
+    help = 'Processes the Eventbrite webhooks queued by accept_webhook.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=WEBHOOK_QUEUE_BATCH_SIZE)
+        parser.add_argument('--concurrency', type=int, default=WEBHOOK_QUEUE_CONCURRENCY)
+        parser.add_argument(
+            '--window',
+            type=float,
+            default=WEBHOOK_BATCH_WINDOW,
+            help='Seconds to wait for more webhooks when a batch is not full.',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=0,
+            help='Keep running, polling every INTERVAL seconds while the queue is empty.',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            claimed, processed = self.drain(
+                options['batch_size'],
+                options['concurrency'],
+                options['window'],
+            )
+            if claimed:
+                self.stdout.write('Processed {} of {} webhooks.'.format(processed, claimed))
+                continue
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
+
+    def drain(self, batch_size, concurrency, window):
+        deliveries = claim_deliveries(batch_size)
+        if deliveries and len(deliveries) < batch_size and window:
+            time.sleep(window)
+            deliveries += claim_deliveries(batch_size - len(deliveries))
+        orders = [
+            delivery for delivery in deliveries
+            if not delivery.internal and delivery.action == 'order.placed'
+        ]
+        others = [delivery for delivery in deliveries if delivery not in orders]
+        processed = 0
+        if orders:
+            with background_requests():
+                processed += process_delivery_batch(orders, process_order_webhooks)
+        if concurrency <= 1 or len(others) <= 1:
+            results = [self.process(delivery) for delivery in others]
+        else:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                results = list(executor.map(self.process_in_thread, others))
+        return len(deliveries), processed + sum(results)
+
+    def process(self, delivery):
+        handler = run_internal_job if delivery.internal else get_data
+        with background_requests():
+            return process_delivery(delivery, handler)
+
+    def process_in_thread(self, delivery):
+        try:
+            return self.process(delivery)
+        finally:
+            connection.close()
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.template.base import logger
+from django.utils import timezone
+
+from documentsManager.app_settings import (
+    ATTENDEES_RECONCILE_LOOKBACK,
+    URL_LOCAL,
+)
+from documentsManager.models import Event
+from documentsManager.rate_limit import background_requests
+from documentsManager.utils import (
+    get_organizer_tokens,
+    reconcile_event_attendees,
+)
+
+
+class Command(BaseCommand):
+    help = 'Creates codes for attendees whose order webhook never arrived.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default=URL_LOCAL)
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=0,
+            help='Keep running, reconciling every INTERVAL seconds.',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            with background_requests():
+                imported = self.reconcile(options['host'])
+            self.stdout.write('Reconciled {} missing attendees.'.format(imported))
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
+
+    def reconcile(self, host):
+        threshold = timezone.now() - timedelta(seconds=ATTENDEES_RECONCILE_LOOKBACK)
+        events = list(Event.objects.filter(
+            Q(end__isnull=True) | Q(end__gte=threshold),
+        ).order_by('id'))
+        organizer_tokens = get_organizer_tokens(events)
+        imported = 0
+        for event in events:
+            if event.organizer_id not in organizer_tokens:
+                continue
+            try:
+                imported += reconcile_event_attendees(
+                    event,
+                    host,
+                    token=organizer_tokens[event.organizer_id],
+                )
+            except Exception as e:
+                # The cursor is left untouched, the next run covers this event
+                logger.exception(e)
+        return imported
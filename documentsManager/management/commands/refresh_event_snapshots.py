@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from documentsManager.app_settings import (
+    EVENT_SNAPSHOT_BATCH_SIZE,
+    EVENT_SNAPSHOT_MAX_AGE,
+)
+from documentsManager.models import Event
+from documentsManager.rate_limit import background_requests
+from documentsManager.utils import refresh_event_snapshots
+
+
+class Command(BaseCommand):
+    help = (
+        'Refreshes the local snapshot of events that have not ended and '
+        'are older than --max-age seconds.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-age', type=int, default=EVENT_SNAPSHOT_MAX_AGE)
+        parser.add_argument('--batch-size', type=int, default=EVENT_SNAPSHOT_BATCH_SIZE)
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=0,
+            help='Keep running, refreshing every INTERVAL seconds.',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            with background_requests():
+                refreshed = self.refresh_stale(options['max_age'], options['batch_size'])
+            self.stdout.write('Refreshed {} event snapshots.'.format(refreshed))
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
+
+    def refresh_stale(self, max_age, batch_size):
+        # Events that already ended keep their last snapshot
+        now = timezone.now()
+        threshold = now - timedelta(seconds=max_age)
+        stale_ids = list(Event.objects.filter(
+            Q(end__isnull=True) | Q(end__gte=now),
+        ).filter(
+            Q(snapshot_updated__isnull=True) | Q(snapshot_updated__lt=threshold),
+        ).values_list('id', flat=True))
+        refreshed = 0
+        for index in range(0, len(stale_ids), batch_size):
+            events = Event.objects.filter(id__in=stale_ids[index:index + batch_size])
+            refreshed += refresh_event_snapshots(list(events))
+        return refreshed
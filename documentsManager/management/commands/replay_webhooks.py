@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from documentsManager.app_settings import (
+    EVENTBRITE_API_URL,
+    WEBHOOK_BATCH_WINDOW,
+    WEBHOOK_QUEUE_BATCH_SIZE,
+    WEBHOOK_QUEUE_CONCURRENCY,
+)
+from documentsManager.management.commands.process_webhooks import (
+    Command as WebhookWorker,
+)
+from documentsManager.models import (
+    WebhookDelivery,
+    WebhookLedger,
+)
+from documentsManager.outbox import discard_emails
+from documentsManager.webhook_journal import (
+    percentile,
+    read_journal,
+    to_stand_in,
+)
+from documentsManager.webhook_queue import (
+    enqueue_webhook,
+    ledger_key,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Replays a journal written by export_webhook_journal against the '
+        'Eventbrite stand-in set in EVENTBRITE_API_URL. Webhooks are queued at '
+        'the recorded rate and drained the way process_webhooks does, which '
+        'reports throughput, latency from arrival to done and database '
+        'queries. Emails are rendered but never reach the outbox, so the '
+        'queries that store them are not counted, nor are those of the '
+        'Eventbrite fetch threads.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('journal')
+        parser.add_argument(
+            '--speed',
+            type=float,
+            default=1.0,
+            help='Multiplier over the recorded arrival rate, 0 replays as fast as possible.',
+        )
+        parser.add_argument('--batch-size', type=int, default=WEBHOOK_QUEUE_BATCH_SIZE)
+        parser.add_argument('--concurrency', type=int, default=WEBHOOK_QUEUE_CONCURRENCY)
+        parser.add_argument('--window', type=float, default=WEBHOOK_BATCH_WINDOW)
+        parser.add_argument(
+            '--reset-ledger',
+            action='store_true',
+            help='Forget the journaled orders first so they are processed again.',
+        )
+
+    def handle(self, *args, **options):
+        if options['speed'] < 0:
+            raise CommandError('--speed must not be negative')
+        if EVENTBRITE_API_URL.startswith('https://www.eventbriteapi.com/'):
+            raise CommandError('Set EVENTBRITE_API_URL to the Eventbrite stand-in first')
+        with open(options['journal']) as journal:
+            records = list(read_journal(journal))
+        if not records:
+            self.stdout.write('The journal is empty.')
+            return
+        bodies = [to_stand_in(json.loads(record['payload'])) for record in records]
+        if options['reset_ledger']:
+            WebhookLedger.objects.filter(api_url__in=[
+                ledger_key(body['api_url']) for body in bodies if body.get('api_url')
+            ]).delete()
+        with discard_emails():
+            ids, queries, elapsed = self.replay(records, bodies, options)
+        self.report(ids, queries, elapsed)
+
+    def replay(self, records, bodies, options):
+        worker = WebhookWorker()
+        first = records[0]['t']
+        started = time.time()
+        queued = list(zip(records, bodies))
+        ids = []
+        queries = 0
+
+        def due_at(record):
+            if not options['speed']:
+                return started
+            return started + (record['t'] - first) / options['speed']
+
+        while True:
+            while queued and due_at(queued[0][0]) <= time.time():
+                record, body = queued.pop(0)
+                try:
+                    ids.append(enqueue_webhook(json.dumps(body), record['host']).id)
+                except ValueError as error:
+                    # Internal jobs in journals exported before they were left out
+                    self.stderr.write('Skipped: {}'.format(error))
+            with CaptureQueriesContext(connection) as captured:
+                claimed, processed = worker.drain(
+                    options['batch_size'],
+                    options['concurrency'],
+                    options['window'],
+                )
+            queries += len(captured)
+            if claimed:
+                continue
+            if not queued:
+                return ids, queries, time.time() - started
+            time.sleep(max(due_at(queued[0][0]) - time.time(), 0))
+
+    def report(self, ids, queries, elapsed):
+        deliveries = list(WebhookDelivery.objects.filter(id__in=ids))
+        done = [delivery for delivery in deliveries if delivery.state == 'done']
+        failed = [delivery for delivery in deliveries if delivery.state != 'done']
+        latencies = [
+            (delivery.processed_at - delivery.created).total_seconds() * 1000
+            for delivery in done
+        ]
+        self.stdout.write('Replayed {} webhooks in {:.2f}s ({:.1f}/s), {} not done.'.format(
+            len(ids), elapsed, len(ids) / elapsed if elapsed else 0, len(failed)))
+        self.stdout.write('Latency ms: p50 {:.1f}, p90 {:.1f}, p99 {:.1f}, max {:.1f}'.format(
+            percentile(latencies, 50),
+            percentile(latencies, 90),
+            percentile(latencies, 99),
+            max(latencies or [0]),
+        ))
+        self.stdout.write('Queries: {} total, {:.1f} per webhook'.format(
+            queries, queries / float(len(ids) or 1)))
+        for delivery in failed[:10]:
+            self.stderr.write('{} ({}): {}'.format(delivery, delivery.attempts, delivery.last_error))
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+import time
+
+from django.core.management.base import BaseCommand
+
+from documentsManager.app_settings import EMAIL_OUTBOX_BATCH_SIZE
+from documentsManager.outbox import (
+    claim_emails,
+    send_emails,
+)
+
+
+class Command(BaseCommand):
+    help = 'Sends the emails queued in the outbox.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=EMAIL_OUTBOX_BATCH_SIZE)
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=0,
+            help='Keep running, polling every INTERVAL seconds while the outbox is empty.',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            emails = claim_emails(options['batch_size'])
+            if emails:
+                sent = send_emails(emails)
+                self.stdout.write('Sent {} of {} emails.'.format(sent, len(emails)))
+                continue
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
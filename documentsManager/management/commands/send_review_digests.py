@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+import time
+
+from django.core.management.base import BaseCommand
+
+from documentsManager.app_settings import URL_LOCAL
+from documentsManager.utils import send_review_digests
+
+
+class Command(BaseCommand):
+    help = 'Sends the hourly and daily review digests that are due to organizers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default=URL_LOCAL)
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=0,
+            help='Keep running, checking for due digests every INTERVAL seconds.',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            sent = send_review_digests(options['host'])
+            self.stdout.write('Queued {} review digests.'.format(sent))
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+from django.core.management.base import BaseCommand
+from django.template.base import logger
+
+from documentsManager.models import UserWebhook
+from documentsManager.rate_limit import background_requests
+from documentsManager.utils import (
+    get_auth_token,
+    update_webhook,
+)
+
+
+class Command(BaseCommand):
+    help = 'Subscribes the existing organizer webhooks to every action in WH_ACTIONS.'
+
+    def handle(self, *args, **options):
+        with background_requests():
+            updated = self.update_all()
+        self.stdout.write('Updated {} webhooks.'.format(updated))
+
+    def update_all(self):
+        updated = 0
+        for webhook in UserWebhook.objects.select_related('user').order_by('id'):
+            try:
+                if update_webhook(get_auth_token(webhook.user), webhook.webhook_id):
+                    updated += 1
+            except Exception as e:
+                # Left as it was, running the command again retries it
+                logger.exception(e)
+        return updated
@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from documentsManager.models import WebhookDelivery
+from documentsManager.webhook_admission import get_metrics
+
+
+class Command(BaseCommand):
+    help = 'Shows the webhook queue depth and the ingestion admission counters.'
+
+    def handle(self, *args, **options):
+        for metric, value in sorted(get_metrics().items()):
+            self.stdout.write('{}: {}'.format(metric, value))
+        states = WebhookDelivery.objects.values('state').annotate(total=Count('id'))
+        for row in states.order_by('state'):
+            self.stdout.write('deliveries {}: {}'.format(row['state'], row['total']))
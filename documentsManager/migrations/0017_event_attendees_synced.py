@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.15 on 2026-10-18 17:00
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documentsManager', '0016_webhookledger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='attendees_synced',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
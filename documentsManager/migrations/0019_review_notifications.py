@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.15 on 2026-10-18 19:00
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documentsManager', '0018_outboundemail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='review_notifications',
+            field=models.CharField(choices=[('immediate', 'Immediately'), ('hourly', 'Hourly digest'), ('daily', 'Daily digest')], default='immediate', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='review_digest_sent',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        # Organizers already heard about the existing reviews
+        migrations.AddField(
+            model_name='review',
+            name='organizer_notified',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AlterField(
+            model_name='review',
+            name='organizer_notified',
+            field=models.BooleanField(default=False),
+        ),
+    ]
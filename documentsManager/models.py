@@ -9,6 +9,13 @@ from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 
 from post_registration import settings
+from .parsed_event import ParsedEvent
+
+
+def as_utc(value):
+    if value is not None and timezone.is_naive(value):
+        return timezone.make_aware(value, timezone.utc)
+    return value
 
 
 class UserManager(BaseUserManager):
@@ -55,13 +62,84 @@ class User(AbstractUser):
         db_table = 'User'
 
 
+REVIEW_NOTIFICATIONS = (
+    ('immediate', 'Immediately'),
+    ('hourly', 'Hourly digest'),
+    ('daily', 'Daily digest'),
+)
+
+
 class Event(models.Model):
+    SNAPSHOT_FIELDS = (
+        'name',
+        'description',
+        'start',
+        'end',
+        'logo',
+        'is_free',
+        'eb_venue_id',
+        'venue',
+        'snapshot_updated',
+    )
     eb_event_id = models.TextField(unique=True)
     organizer = models.ForeignKey(User, blank=False)
     init_submission = models.DateField(default=timezone.now)
     end_submission = models.DateField(null=True)
     start_evaluation = models.DateField(default=datetime.date.today)
     end_evaluation = models.DateField(blank=True, null=True)
+    # Snapshot of the Eventbrite event, as produced by parse_events
+    name = models.CharField(max_length=255, blank=True)
+    description = models.TextField(blank=True, null=True)
+    start = models.DateTimeField(blank=True, null=True)
+    end = models.DateTimeField(blank=True, null=True)
+    logo = models.TextField(blank=True, null=True)
+    is_free = models.BooleanField(default=False)
+    eb_venue_id = models.CharField(max_length=100, blank=True, db_index=True)
+    venue = models.CharField(max_length=500, blank=True)
+    snapshot_updated = models.DateTimeField(blank=True, null=True, db_index=True)
+    # Cursor of the attendee reconciliation (Eventbrite changed_since)
+    attendees_synced = models.DateTimeField(blank=True, null=True)
+    # How the organizer hears about reviews, see send_review_digests
+    review_notifications = models.CharField(
+        max_length=20,
+        choices=REVIEW_NOTIFICATIONS,
+        default='immediate',
+    )
+    review_digest_sent = models.DateTimeField(blank=True, null=True)
+
+    @property
+    def has_snapshot(self):
+        return self.snapshot_updated is not None
+
+    @property
+    def snapshot(self):
+        return ParsedEvent(
+            id=self.id,
+            eb_id=self.eb_event_id,
+            name=self.name,
+            description=self.description,
+            start=self.start,
+            end=self.end,
+            logo=self.logo,
+            is_free=self.is_free,
+            venue_id=self.eb_venue_id,
+            venue=self.venue,
+        )
+
+    def update_snapshot(self, parsed_event):
+        self.apply_snapshot(parsed_event)
+        self.save(update_fields=self.SNAPSHOT_FIELDS)
+
+    def apply_snapshot(self, parsed_event):
+        self.name = parsed_event['name'] or ''
+        self.description = parsed_event['description']
+        self.start = as_utc(parsed_event['start'])
+        self.end = as_utc(parsed_event['end'])
+        self.logo = parsed_event['logo']
+        self.is_free = bool(parsed_event['is_free'])
+        self.eb_venue_id = parsed_event['venue_id'] or ''
+        self.venue = parsed_event['venue'] or ''
+        self.snapshot_updated = timezone.now()
 
     class Meta(object):
         db_table = 'Event'
@@ -230,6 +308,7 @@ class Review(models.Model):
     date = models.DateField(default=timezone.now)
     approved = models.BooleanField()
     justification = models.CharField(max_length=500, blank=True, null=True)
+    organizer_notified = models.BooleanField(default=False)
 
     class Meta:
         unique_together = ('evaluator', 'submission')
@@ -246,6 +325,8 @@ class Result(models.Model):
         null=True,
         unique=True
     )
+    # When the attendee was emailed the outcome, see publish_results
+    published_at = models.DateTimeField(blank=True, null=True)
 
     class Meta:
         db_table = 'Result'
@@ -260,3 +341,109 @@ class UserWebhook(models.Model):
 
     class Meta:
         db_table = 'UserWebhook'
+
+
+class WebhookDelivery(models.Model):
+    STATES = (
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('done', 'Done'),
+        ('dead', 'Dead'),
+    )
+    payload = models.TextField()
+    host = models.CharField(max_length=255, blank=True)
+    action = models.CharField(max_length=50, blank=True)
+    state = models.CharField(max_length=20, choices=STATES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(blank=True, null=True)
+    # Jobs queued by the app itself, e.g. an attendee import. Never set
+    # from a request body, so a forged webhook cannot start one.
+    internal = models.BooleanField(default=False)
+
+    def __str__(self):
+        return '{} #{} ({})'.format(self.action, self.id, self.state)
+
+    class Meta(object):
+        db_table = 'WebhookDelivery'
+        index_together = ('state', 'available_at')
+
+
+class RateBucket(models.Model):
+    # Eventbrite call budget of one OAuth token, see rate_limit.try_acquire
+    token_hash = models.CharField(max_length=40, unique=True)
+    tokens = models.FloatField()
+    updated = models.FloatField()
+
+    class Meta(object):
+        db_table = 'RateBucket'
+
+
+class WebhookLedger(models.Model):
+    # One row per Eventbrite resource already handled, e.g. an order api_url
+    api_url = models.CharField(max_length=255, unique=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta(object):
+        db_table = 'WebhookLedger'
+
+
+class ResultPublication(models.Model):
+    # Progress of one "publish results" run of an event
+    STATES = (
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+    event = models.ForeignKey(Event, on_delete=models.CASCADE)
+    state = models.CharField(max_length=20, choices=STATES, default='pending')
+    total = models.PositiveIntegerField(default=0)
+    published = models.PositiveIntegerField(default=0)
+    created = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    @property
+    def progress(self):
+        if not self.total:
+            return 100
+        return min(self.published * 100 // self.total, 100)
+
+    def __str__(self):
+        return '{} of {} results ({})'.format(self.published, self.total, self.state)
+
+    class Meta(object):
+        db_table = 'ResultPublication'
+
+
+class OutboundEmail(models.Model):
+    # One row per recipient, written in the transaction of the change that
+    # triggered it and sent by the send_emails command
+    STATES = (
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('dead', 'Dead'),
+    )
+    subject = models.CharField(max_length=255)
+    from_email = models.CharField(max_length=254, blank=True)
+    to = models.CharField(max_length=254)
+    body = models.TextField()
+    html = models.TextField(blank=True)
+    state = models.CharField(max_length=20, choices=STATES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return '{} to {} ({})'.format(self.subject, self.to, self.state)
+
+    class Meta(object):
+        db_table = 'OutboundEmail'
+        index_together = ('state', 'available_at')
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+import time
+from threading import Lock
+
+from social_django.models import UserSocialAuth
+
+from .app_settings import ORGANIZER_TOKENS_TTL
+
+# Eventbrite uid -> access token of every connected organizer, so webhook
+# gating is a dict lookup. Social-auth signals clear it in this process;
+# the TTL and the fallback on misses cover changes made by other processes.
+_tokens = {}
+_loaded_at = None
+_lock = Lock()
+
+
+def load_organizer_tokens():
+    return {
+        uid: (extra_data or {}).get('access_token')
+        for uid, extra_data in UserSocialAuth.objects.filter(
+            provider='eventbrite',
+        ).values_list('uid', 'extra_data')
+    }
+
+
+def get_organizer_token(uid):
+    global _tokens, _loaded_at
+    with _lock:
+        if _loaded_at is None or time.monotonic() - _loaded_at > ORGANIZER_TOKENS_TTL:
+            _tokens = load_organizer_tokens()
+            _loaded_at = time.monotonic()
+        if uid in _tokens:
+            return _tokens[uid]
+    social_user = UserSocialAuth.objects.filter(
+        provider='eventbrite',
+        uid=uid,
+    ).first()
+    if social_user is None:
+        return None
+    with _lock:
+        _tokens[uid] = social_user.access_token
+    return social_user.access_token
+
+
+def clear_organizer_tokens(**kwargs):
+    global _tokens, _loaded_at
+    with _lock:
+        _tokens = {}
+        _loaded_at = None
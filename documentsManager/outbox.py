@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+import smtplib
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.core import mail
+from django.db import transaction
+from django.db.models import F, Q
+from django.template.base import logger
+from django.utils import timezone
+
+from .app_settings import (
+    EMAIL_OUTBOX_LOCK_TIMEOUT,
+    EMAIL_OUTBOX_MAX_ATTEMPTS,
+)
+from .models import OutboundEmail
+from .webhook_queue import retry_delay
+
+# Set by replay_webhooks so replayed orders never email real attendees
+_discarding = False
+
+
+@contextmanager
+def discard_emails():
+    # Emails are still built, so rendering stays in the measurements, but
+    # no rows reach the outbox. Applies to every thread of the process.
+    global _discarding
+    _discarding = True
+    try:
+        yield
+    finally:
+        _discarding = False
+
+
+def queue_message(message):
+    return queue_messages([message])
+
+
+def queue_messages(messages):
+    # The rows join the caller's transaction, so an email is sent only if
+    # the change that triggered it was committed. Returns how many
+    # recipients were queued, like send_messages does.
+    emails = [
+        OutboundEmail(
+            subject=message.subject,
+            from_email=message.from_email or '',
+            to=recipient,
+            body=message.body,
+            html=html_alternative(message),
+        )
+        for message in messages
+        for recipient in message.recipients()
+    ]
+    if not _discarding:
+        OutboundEmail.objects.bulk_create(emails)
+    return len(emails)
+
+
+def html_alternative(message):
+    for content, mimetype in getattr(message, 'alternatives', ()):
+        if mimetype == 'text/html':
+            return content
+    return ''
+
+
+def build_message(email):
+    message = mail.EmailMultiAlternatives(
+        email.subject,
+        email.body,
+        email.from_email or None,
+        [email.to],
+    )
+    if email.html:
+        message.attach_alternative(email.html, 'text/html')
+    return message
+
+
+def claim_emails(limit):
+    # Emails left in 'sending' by a worker that died are picked up again
+    # once their lock expires.
+    now = timezone.now()
+    expired = now - timedelta(seconds=EMAIL_OUTBOX_LOCK_TIMEOUT)
+    with transaction.atomic():
+        ids = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True).filter(
+                Q(state='pending', available_at__lte=now) |
+                Q(state='sending', locked_at__lt=expired),
+            ).order_by('available_at', 'id').values_list('id', flat=True)[:limit]
+        )
+        OutboundEmail.objects.filter(id__in=ids).update(
+            state='sending',
+            locked_at=now,
+            attempts=F('attempts') + 1,
+        )
+    return list(OutboundEmail.objects.filter(id__in=ids).order_by('id'))
+
+
+def fail_email(email, error, permanent=False):
+    now = timezone.now()
+    changes = {
+        'locked_at': None,
+        'last_error': '{}: {}'.format(type(error).__name__, error),
+    }
+    if permanent or email.attempts >= EMAIL_OUTBOX_MAX_ATTEMPTS:
+        changes.update(state='dead')
+    else:
+        changes.update(
+            state='pending',
+            available_at=now + timedelta(seconds=retry_delay(email.attempts)),
+        )
+    OutboundEmail.objects.filter(id=email.id).update(**changes)
+    return changes['state']
+
+
+def mark_sent(emails):
+    OutboundEmail.objects.filter(id__in=[email.id for email in emails]).update(
+        state='sent',
+        locked_at=None,
+        last_error='',
+        sent_at=timezone.now(),
+    )
+
+
+def open_connection(connection, emails):
+    # When the session can't be opened the emails are released for a
+    # later attempt instead of waiting in 'sending' for their lock to expire
+    try:
+        connection.open()
+    except Exception as error:
+        logger.exception(error)
+        for email in emails:
+            fail_email(email, error)
+        return False
+    return True
+
+
+def send_emails(emails, connection=None):
+    # Every message goes through one SMTP session; they are handed over one
+    # at a time so each recipient gets its own status. Returns how many
+    # were sent.
+    if connection is None:
+        connection = mail.get_connection()
+    if not open_connection(connection, emails):
+        return 0
+    sent = []
+    try:
+        for index, email in enumerate(emails):
+            try:
+                if not connection.send_messages([build_message(email)]):
+                    fail_email(email, smtplib.SMTPException('The message was not sent'))
+                    continue
+            except smtplib.SMTPRecipientsRefused as error:
+                fail_email(email, error, permanent=True)
+                continue
+            except Exception as error:
+                logger.exception(error)
+                fail_email(email, error)
+                # The session may be broken, the rest go through a new one
+                connection.close()
+                if not open_connection(connection, emails[index + 1:]):
+                    break
+                continue
+            sent.append(email)
+    finally:
+        connection.close()
+        mark_sent(sent)
+    return len(sent)
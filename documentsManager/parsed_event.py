@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime
+
+EB_DATETIME_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+_FIELDS = (
+    'eb_id',
+    'name',
+    'start',
+    'end',
+    'is_free',
+    'venue_id',
+    'id',
+    'event_id',
+    'stale',
+)
+# Only computed from the API payload when a template or caller asks for them
+_LAZY_FIELDS = (
+    'description',
+    'logo',
+    'venue',
+)
+_KEYS = frozenset(_FIELDS + _LAZY_FIELDS + ('eb_event_start',))
+_MISSING = object()
+
+
+def parse_utc(value):
+    # Eventbrite always sends 'YYYY-MM-DDTHH:MM:SSZ', slicing it is several
+    # times cheaper than strptime, which stays as the fallback.
+    if len(value) == 20 and value[19] == 'Z':
+        try:
+            return datetime(
+                int(value[0:4]),
+                int(value[5:7]),
+                int(value[8:10]),
+                int(value[11:13]),
+                int(value[14:16]),
+                int(value[17:19]),
+            )
+        except ValueError:
+            pass
+    return datetime.strptime(value, EB_DATETIME_FORMAT)
+
+
+def _description(api_event):
+    return api_event.get('description', {}).get('text', 'No description')
+
+
+def _logo(api_event):
+    return (api_event.get('logo', {}) or {}).get('original', {}).get('url', None)
+
+
+def _venue(api_event):
+    if not api_event.get('venue_id', {}):
+        return ''
+    return api_event.get('venue', {}).get(
+        'address', {}).get('localized_address_display', None)
+
+
+_LAZY_PARSERS = {
+    'description': _description,
+    'logo': _logo,
+    'venue': _venue,
+}
+
+
+class ParsedEvent(object):
+    """
+    Immutable view of an Eventbrite event. Item access (event['name'])
+    works like the dicts parse_events used to return, so templates and
+    callers need not care; use replace() to get a changed copy.
+    """
+    __slots__ = _FIELDS + tuple(
+        '_' + name for name in _LAZY_FIELDS
+    ) + ('_api_event',)
+
+    def __init__(self, api_event=None, **fields):
+        unknown = set(fields).difference(_FIELDS, _LAZY_FIELDS)
+        if unknown:
+            raise TypeError('Unknown event fields: {}'.format(
+                ', '.join(sorted(unknown))))
+        set_field = object.__setattr__
+        set_field(self, '_api_event', api_event)
+        for name in _FIELDS:
+            set_field(self, name, fields.get(name))
+        for name in _LAZY_FIELDS:
+            set_field(self, '_' + name, fields.get(name, _MISSING))
+
+    @classmethod
+    def from_api(cls, api_event):
+        return cls(
+            api_event,
+            eb_id=api_event.get('id', None),
+            name=api_event.get('name', {}).get('text', 'Unnamed'),
+            start=parse_utc(api_event['start']['utc']),
+            end=parse_utc(api_event['end']['utc']),
+            is_free=api_event.get('is_free', {}),
+            venue_id=api_event.get('venue_id', {}),
+        )
+
+    def _lazy(self, name):
+        value = getattr(self, '_' + name)
+        if value is _MISSING:
+            value = _LAZY_PARSERS[name](self._api_event or {})
+            object.__setattr__(self, '_' + name, value)
+        return value
+
+    @property
+    def description(self):
+        return self._lazy('description')
+
+    @property
+    def logo(self):
+        return self._lazy('logo')
+
+    @property
+    def venue(self):
+        return self._lazy('venue')
+
+    @property
+    def eb_event_start(self):
+        if self.start is None:
+            return ''
+        return self.start.strftime(EB_DATETIME_FORMAT)
+
+    def replace(self, **changes):
+        fields = {name: getattr(self, name) for name in _FIELDS}
+        for name in _LAZY_FIELDS:
+            fields[name] = getattr(self, '_' + name)
+        fields.update(changes)
+        return ParsedEvent(self._api_event, **fields)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('ParsedEvent is immutable, use replace()')
+
+    def __delattr__(self, name):
+        raise AttributeError('ParsedEvent is immutable')
+
+    def __getitem__(self, key):
+        if key not in _KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key):
+        return key in _KEYS
+
+    def get(self, key, default=None):
+        if key not in _KEYS:
+            return default
+        return getattr(self, key)
+
+    def keys(self):
+        return sorted(_KEYS)
+
+    def as_dict(self):
+        return {key: getattr(self, key) for key in _KEYS}
+
+    def __eq__(self, other):
+        if not isinstance(other, ParsedEvent):
+            return NotImplemented
+        return self.as_dict() == other.as_dict()
+
+    __hash__ = None
+
+    def __repr__(self):
+        return '<ParsedEvent eb_id={!r} name={!r}>'.format(self.eb_id, self.name)
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import random
+import time
+from contextlib import contextmanager
+from threading import local
+
+from django.db import IntegrityError, transaction
+
+from .app_settings import (
+    EVENTBRITE_BACKOFF_BASE,
+    EVENTBRITE_BACKOFF_MAX,
+    EVENTBRITE_INTERACTIVE_RESERVE,
+    EVENTBRITE_RATE_LIMIT,
+    EVENTBRITE_RATE_MAX_WAIT,
+    EVENTBRITE_RATE_PERIOD,
+)
+from .models import RateBucket
+
+REFILL_RATE = EVENTBRITE_RATE_LIMIT / float(EVENTBRITE_RATE_PERIOD)
+
+_priority = local()
+
+
+class RateLimited(Exception):
+
+    def __init__(self, retry_after):
+        super(RateLimited, self).__init__(
+            'Eventbrite rate limit reached, retry in {:.0f}s'.format(retry_after))
+        self.retry_after = retry_after
+
+
+@contextmanager
+def background_requests():
+    previous = is_background()
+    _priority.background = True
+    try:
+        yield
+    finally:
+        _priority.background = previous
+
+
+def is_background():
+    return getattr(_priority, 'background', False)
+
+
+def bucket_key(token):
+    return hashlib.sha1(token.encode('utf-8')).hexdigest()
+
+
+def refill(bucket, now):
+    tokens = bucket.tokens + (now - bucket.updated) * REFILL_RATE
+    return min(EVENTBRITE_RATE_LIMIT, tokens)
+
+
+def locked_bucket(token):
+    # Must run inside a transaction. The row lock makes the workers of
+    # every process take turns, so no decrement is lost.
+    key = bucket_key(token)
+    try:
+        return RateBucket.objects.select_for_update().get(token_hash=key)
+    except RateBucket.DoesNotExist:
+        pass
+    try:
+        with transaction.atomic():
+            return RateBucket.objects.create(
+                token_hash=key,
+                tokens=EVENTBRITE_RATE_LIMIT,
+                updated=time.time(),
+            )
+    except IntegrityError:
+        return RateBucket.objects.select_for_update().get(token_hash=key)
+
+
+def remaining_budget(token):
+    bucket = RateBucket.objects.filter(token_hash=bucket_key(token)).first()
+    if bucket is None:
+        return EVENTBRITE_RATE_LIMIT
+    return int(refill(bucket, time.time()))
+
+
+def try_acquire(token, background=False):
+    # Background work leaves EVENTBRITE_INTERACTIVE_RESERVE calls untouched
+    # so that organizer pages keep working while jobs are throttled.
+    floor = EVENTBRITE_INTERACTIVE_RESERVE if background else 0
+    with transaction.atomic():
+        bucket = locked_bucket(token)
+        now = time.time()
+        tokens = refill(bucket, now)
+        missing = floor + 1 - tokens
+        if missing > 0:
+            return missing / REFILL_RATE
+        RateBucket.objects.filter(id=bucket.id).update(tokens=tokens - 1, updated=now)
+    return 0
+
+
+def acquire(token, deadline=None):
+    background = is_background()
+    if deadline is None:
+        deadline = time.time() + EVENTBRITE_RATE_MAX_WAIT
+    while True:
+        wait = try_acquire(token, background)
+        if not wait:
+            return
+        if background or time.time() + wait > deadline:
+            raise RateLimited(wait)
+        time.sleep(wait)
+
+
+def exhaust(token):
+    # Eventbrite answered 429: empty the bucket so that other workers back off too.
+    with transaction.atomic():
+        bucket = locked_bucket(token)
+        RateBucket.objects.filter(id=bucket.id).update(tokens=0, updated=time.time())
+
+
+def backoff_delay(attempt, retry_after=None):
+    if retry_after is not None:
+        return min(retry_after, EVENTBRITE_BACKOFF_MAX)
+    return random.uniform(0, min(EVENTBRITE_BACKOFF_MAX, EVENTBRITE_BACKOFF_BASE * 2 ** attempt))
+
+
+def parse_retry_after(response):
+    try:
+        return float(response.headers['Retry-After'])
+    except (KeyError, TypeError, ValueError):
+        return None
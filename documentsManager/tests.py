@@ -1,18 +1,47 @@
-from datetime import datetime
-from unittest.mock import patch
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from io import StringIO
+from unittest.mock import MagicMock, patch
 
 from django.apps import apps
 from django.core.exceptions import ImproperlyConfigured
+from django.core import mail
 from django.core.files import File
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
 from django.core.urlresolvers import resolve, reverse
+from django.db import transaction
 from django.db.utils import DataError
 from django.template.loader import render_to_string
 from django.test import Client
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.utils import timezone
 from social_django.models import UserSocialAuth
 
 from post_registration import settings
+from .app_settings import WEBHOOK_MAX_ATTEMPTS
 from .apps import DocumentsmanagerConfig
+from .circuit_breaker import (
+    CircuitBreaker,
+    CircuitOpen,
+)
+from .email_templates import (
+    clear_email_templates,
+    render_email,
+)
+from .event_cache import (
+    clear_event_cache,
+    invalidate_event,
+)
+from .eventbrite_client import (
+    EventbriteClient,
+    EventbriteServerError,
+    breaker,
+    close_clients,
+    get_client,
+)
 from .forms import (
     EvaluatorForm,
     EvaluationDateForm,
@@ -21,6 +50,12 @@ from .forms import (
     SubmissionForm,
     TextDocForm,
 )
+from .rate_limit import (
+    RateLimited,
+    background_requests,
+    remaining_budget,
+    try_acquire,
+)
 from .models import (
     Attendee,
     AttendeeCode,
@@ -30,36 +65,76 @@ from .models import (
     FileDoc,
     FileSubmission,
     FileType,
+    OutboundEmail,
     Result,
+    ResultPublication,
     Review,
     Submission,
     TextDoc,
     TextSubmission,
     User,
     UserWebhook,
+    WebhookDelivery,
+    WebhookLedger,
+)
+from .organizer_tokens import clear_organizer_tokens
+from .outbox import (
+    claim_emails,
+    discard_emails,
+    send_emails,
 )
+from .parsed_event import (
+    ParsedEvent,
+    parse_utc,
+)
+from .single_flight import SingleFlight
 from .utils import (
     add_event,
-    create_attendee_code,
     create_order_webhook_from_view,
+    evaluator_events,
     filter_managed_event,
     filter_no_managed_event,
     get_access_token_form_user_id,
     get_auth_token,
     get_eventbrite_data,
     get_data,
+    get_managed_events,
     get_docs_from_event,
+    get_event_snapshot,
+    get_one_event_api,
     get_parsed_event,
-    get_social_user,
+    import_event_attendees,
+    iter_events_api,
     notify_attendee_from_attende_code,
-    send_email_to_attende,
+    parse_events,
+    process_order_webhooks,
+    publish_results,
+    send_emails_to_attendees,
     send_evaluator_decision_to_organizer,
+    send_review_digests,
     send_success_submission_email,
-    social_user_exists,
     validate_files_submissions,
     validate_text_submissions,
     webhook_available_to_process,
 )
+from .webhook_admission import (
+    flush_metrics,
+    get_metrics,
+    reset_queue_depth,
+)
+from .webhook_journal import (
+    iter_journal,
+    percentile,
+    read_journal,
+    to_stand_in,
+    write_journal,
+)
+from .webhook_queue import (
+    claim_deliveries,
+    enqueue_results_publication,
+    enqueue_webhook,
+    process_delivery,
+)
 
 MOCK_EVENTS_API = {
     'name': {
@@ -228,6 +303,9 @@ MOCK_EVENTS_API_2 = {
 
 class TestBase(TestCase):
     def setUp(self):
+        clear_event_cache()
+        clear_organizer_tokens()
+        reset_queue_depth()
         self.attendee = Attendee.objects.create(
             email='prueba@ejemplo.com',
             name='John Doe'
@@ -287,14 +365,14 @@ class ViewTest(TestBase):
         response = self.client.get('/accounts/login/')
         self.assertEqual(response.status_code, 200)
 
-    @patch('documentsManager.utils.Eventbrite.get')
+    @patch('documentsManager.eventbrite_client.EventbriteClient.get')
     def test_access_submission_dashboard(self, mock_eventbrite_get):
         mock_eventbrite_get.return_value = MOCK_EVENTS_API
         event = self.event
         response = self.client.get('/event/{}/submissions/'.format(event.id))
         self.assertEqual(response.status_code, 200)
 
-    @patch('documentsManager.utils.Eventbrite.get')
+    @patch('documentsManager.eventbrite_client.EventbriteClient.get')
     def test_docs_redirect(self, mock_eventbrite_get):
         mock_eventbrite_get.return_value = MOCK_EVENTS_API
         new_event = self.event
@@ -305,7 +383,7 @@ class ViewTest(TestBase):
         response = self.client.get('/events/')
         self.assertEqual(response.status_code, 200)
 
-    @patch('documentsManager.utils.Eventbrite.get')
+    @patch('documentsManager.eventbrite_client.EventbriteClient.get')
     def test_doc_form_redirect(self, mock_api_evb):
         mock_api_evb.return_value = MOCK_EVENTS_API
         new_event = self.event
@@ -317,7 +395,7 @@ class ViewTest(TestBase):
         self.assertEqual(response.status_code, 200)
 
     def test_home_filter(self):
-        api_events = [{'eb_id': '1'}, {'eb_id': '2'}, {'eb_id': '3'}]
+        api_events = [ParsedEvent(eb_id='1'), ParsedEvent(eb_id='2'), ParsedEvent(eb_id='3')]
         model_events = [['1', '1'], ['3', '3']]
         result = filter_managed_event(api_events, model_events)
         self.assertEqual(len(result), 2)
@@ -328,7 +406,20 @@ class ViewTest(TestBase):
         result = filter_no_managed_event(api_events, model_events)
         self.assertEqual(len(result), 1)
 
-    @patch('documentsManager.utils.Eventbrite.get')
+    def test_home_filter_matches_exact_ids(self):
+        api_events = [ParsedEvent(eb_id='1'), ParsedEvent(eb_id='12')]
+        result = filter_managed_event(api_events, {'12': 7})
+        self.assertEqual(result, [ParsedEvent(eb_id='12', id=7)])
+        self.assertIsNone(api_events[1]['id'])
+
+    def test_managed_events_scoped_to_api_ids(self):
+        Event.objects.create(eb_event_id='99999', organizer=self.user)
+        api_events = [{'eb_id': '1'}, {'eb_id': '2'}]
+        with self.assertNumQueries(1):
+            managed = get_managed_events(api_events)
+        self.assertEqual(managed, {'1': self.event.id})
+
+    @patch('documentsManager.eventbrite_client.EventbriteClient.get')
     def test_create_and_save_event(self, mock_api_evb):
         mock_api_evb.return_value = MOCK_EVENTS_API
         response = self.client.get('/events/50285339/')
@@ -355,7 +446,7 @@ class ViewTest(TestBase):
         self.assertEqual(result.init_submission, expected)
         self.assertEqual(response.url, '/event/{}/docs/'.format(new_event.id))
 
-    @patch('documentsManager.utils.Eventbrite.get')
+    @patch('documentsManager.eventbrite_client.EventbriteClient.get')
     def test_response_with_landing_page(self, mock_api_evb):
         mock_api_evb.return_value = MOCK_EVENTS_API
         event = self.event
@@ -368,7 +459,7 @@ class ViewTest(TestBase):
         response = self.client.get('/landing/{}/success/'.format(event.id))
         self.assertEqual(response.status_code, 200)
 
-    @patch('documentsManager.utils.Eventbrite.get')
+    @patch('documentsManager.eventbrite_client.EventbriteClient.get')
     def test_response_with_landing_page_with_text_doc(self, mock_api_evb):
         mock_api_evb.return_value = MOCK_EVENTS_API
         event = self.event
@@ -378,7 +469,7 @@ class ViewTest(TestBase):
         self.assertTrue('text_docs' in response.context)
         self.assertTrue('file_docs' in response.context)
 
-    @patch('documentsManager.utils.Eventbrite.get')
+    @patch('documentsManager.eventbrite_client.EventbriteClient.get')
     def test_new_file_doc_submission(self, mock_api_evb):
         mock_api_evb.return_value = MOCK_EVENTS_API
         new_event = self.event
@@ -401,7 +492,7 @@ class ViewTest(TestBase):
         self.assertEqual(result.name, 'prueba')
         self.assertRedirects(response, reverse('docs', kwargs={'event_id': new_event.id}))
 
-    @patch('documentsManager.utils.Eventbrite.get')
+    @patch('documentsManager.eventbrite_client.EventbriteClient.get')
     def test_new_text_doc_submission(self, mock_api_evb):
         mock_api_evb.return_value = MOCK_EVENTS_API
         new_event = self.event
@@ -426,7 +517,7 @@ class ViewTest(TestBase):
         self.assertEqual(result.name, 'CV')
         self.assertRedirects(response, reverse('docs', kwargs={'event_id': new_event.id}))
 
-    @patch('documentsManager.utils.Eventbrite.get')
+    @patch('documentsManager.eventbrite_client.EventbriteClient.get')
     def test_not_valid_text_doc_submission(self, mock_api_evb):
         mock_api_evb.return_value = MOCK_EVENTS_API
         new_event = self.event
@@ -707,7 +798,7 @@ class TextDocUpdateTest(TestBase):
         )
         self.assertEqual(response.context_data['event_id'], str(self.event.id))
 
-    @patch('documentsManager.utils.Eventbrite.get')
+    @patch('documentsManager.eventbrite_client.EventbriteClient.get')
     def test_text_doc_success_redirect(self, mock_eventbrite_get):
         mock_eventbrite_get.return_value = MOCK_EVENTS_API
         data = {
@@ -757,7 +848,7 @@ class EvaluatorTest(TestBase):
         self.assertEqual(
             str(Evaluator._meta.verbose_name_plural), "evaluators")
 
-    @patch('documentsManager.utils.Eventbrite.get')
+    @patch('documentsManager.eventbrite_client.EventbriteClient.get')
     def test_login_with_Eval_1_accepted(self, mock_eventbrite_get):
         mock_eventbrite_get.return_value = MOCK_EVENTS_API
         new_event = Event.objects.create(
@@ -786,8 +877,8 @@ class EvaluatorTest(TestBase):
             '/event/{}/submissions/'.format(new_event.id),
         )
 
-    @patch('documentsManager.utils.Eventbrite.get')
-    @patch('documentsManager.utils.Eventbrite.get')
+    @patch('documentsManager.eventbrite_client.EventbriteClient.get')
+    @patch('documentsManager.eventbrite_client.EventbriteClient.get')
     def test_login_with_Eval_2_accepted(
             self, mock_eventbrite_get, mock_eventbrite_get_2):
         mock_eventbrite_get.return_value = MOCK_EVENTS_API
@@ -831,7 +922,7 @@ class EvaluatorTest(TestBase):
         self.assertEquals(response2.wsgi_request.path, '/')
 
 
-@patch('documentsManager.views.get_one_event_api')
+@patch('documentsManager.utils.get_one_event_api')
 class EvaluatorListTest(TestBase):
     def test_evaluator_list_view_name(self, mock_get_one_event_api):
         mock_get_one_event_api.return_value = [MOCK_EVENTS_API]
@@ -894,14 +985,14 @@ class EvaluatorCreateTest(TestBase):
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, 'evaluator_form.html')
 
-    @patch('documentsManager.forms.render_to_string')
-    @patch('documentsManager.views.get_one_event_api')
+    @patch('documentsManager.utils.render_email')
+    @patch('documentsManager.utils.get_one_event_api')
     def test_evaluator_success_url(
             self,
             mock_get_one_event_api,
-            mock_render_to_string):
+            mock_render_email):
         mock_get_one_event_api.return_value = [MOCK_EVENTS_API]
-        mock_render_to_string.return_value = render_to_string('empty.html', {})
+        mock_render_email.return_value = (render_to_string('empty.html', {}), '')
         event = self.create_event()
         data = {
             'name': 'John',
@@ -920,7 +1011,7 @@ class EvaluatorCreateTest(TestBase):
             'evaluators', kwargs={'event_id': event.id}))
 
 
-@patch('documentsManager.views.get_one_event_api')
+@patch('documentsManager.utils.get_one_event_api')
 class EvaluatorUpdateTest(TestBase):
 
     def setUp(self):
@@ -1004,7 +1095,7 @@ class EvaluatorUpdateTest(TestBase):
         self.assertEqual(self.evaluator.email, 'test@mail.com')
 
 
-@patch('documentsManager.views.get_one_event_api')
+@patch('documentsManager.utils.get_one_event_api')
 class DocDeleteTest(TestBase):
     def setUp(self):
         super(DocDeleteTest, self).setUp()
@@ -1069,7 +1160,7 @@ class DocDeleteTest(TestBase):
         )
 
 
-@patch('documentsManager.views.get_one_event_api')
+@patch('documentsManager.utils.get_one_event_api')
 class DocUpdateTest(TestBase):
     def setUp(self):
         super(DocUpdateTest, self).setUp()
@@ -1110,7 +1201,7 @@ class DocUpdateTest(TestBase):
         self.assertEqual(self.text_doc.name, 'CV')
 
 
-@patch('documentsManager.views.get_one_event_api')
+@patch('documentsManager.utils.get_one_event_api')
 class EvaluatorDeleteTest(TestBase):
 
     def setUp(self):
@@ -1274,7 +1365,7 @@ class EvaluatorCreateReview(TestBase):
         review = Review.objects.filter(evaluator=self.evaluator, submission=self.file).first()
         self.assertTrue(review.approved)
 
-    @patch('documentsManager.views.get_one_event_api')
+    @patch('documentsManager.utils.get_one_event_api')
     def test_evaluator_not_valid(self, mock_get_one_event_api):
         mock_get_one_event_api.return_value = [MOCK_EVENTS_API]
         comment = 501 * 'a'
@@ -1330,7 +1421,7 @@ class EvaluatorCreateReview(TestBase):
         self.assertFalse(review.approved)
         self.assertEqual(self.text.textsubmission.description(), 'description_prueba')
 
-    @patch('documentsManager.views.get_one_event_api')
+    @patch('documentsManager.utils.get_one_event_api')
     def test_review_view_file_submission(self, mock_get_one_event_api):
         mock_get_one_event_api.return_value = [MOCK_EVENTS_API]
         self.client.login(email='john@email.com', password='john1234')
@@ -1382,7 +1473,7 @@ class OrganizerSubmission(TestBase):
             password='john1234',
         )
 
-    @patch('documentsManager.views.get_one_event_api')
+    @patch('documentsManager.utils.get_one_event_api')
     def test_filesubmission(self, mock_get_one_event_api):
         mock_get_one_event_api.return_value = [MOCK_EVENTS_API]
         response = self.client.get(
@@ -1396,7 +1487,7 @@ class OrganizerSubmission(TestBase):
         )
         self.assertEqual(response.context_data['object'].id, self.file.id)
 
-    @patch('documentsManager.views.get_one_event_api')
+    @patch('documentsManager.utils.get_one_event_api')
     def test_textsubmission(self, mock_get_one_event_api):
         mock_get_one_event_api.return_value = [MOCK_EVENTS_API]
         response = self.client.get(
@@ -1410,7 +1501,7 @@ class OrganizerSubmission(TestBase):
         )
         self.assertEqual(response.context_data['object'].id, self.text.id)
 
-    @patch('documentsManager.views.get_one_event_api')
+    @patch('documentsManager.utils.get_one_event_api')
     def test_submission_view_template(self, mock_get_one_event_api):
         mock_get_one_event_api.return_value = [MOCK_EVENTS_API]
         response = self.client.get(
@@ -1425,7 +1516,7 @@ class OrganizerSubmission(TestBase):
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, 'submission.html')
 
-    @patch('documentsManager.views.get_one_event_api')
+    @patch('documentsManager.utils.get_one_event_api')
     def test_submission_view_name(self, mock_get_one_event_api):
         mock_get_one_event_api.return_value = [MOCK_EVENTS_API]
         view = resolve(
@@ -1439,7 +1530,7 @@ class OrganizerSubmission(TestBase):
         )
         self.assertEqual(view.url_name, 'submission')
 
-    @patch('documentsManager.views.get_one_event_api')
+    @patch('documentsManager.utils.get_one_event_api')
     def test_submission_context(self, mock_get_one_event_api):
         mock_get_one_event_api.return_value = [MOCK_EVENTS_API]
         Review.objects.create(
@@ -1470,7 +1561,7 @@ class OrganizerSubmission(TestBase):
         result = send_evaluator_decision_to_organizer(self.event.id, review)
         self.assertTrue(result)
 
-    @patch('documentsManager.views.get_one_event_api')
+    @patch('documentsManager.utils.get_one_event_api')
     def test_submission_reviews_in_context(self, mock_get_one_event_api):
         mock_get_one_event_api.return_value = [MOCK_EVENTS_API]
         Review.objects.create(
@@ -1498,9 +1589,9 @@ class OrganizerSubmission(TestBase):
 
 
 class AcceptInvitationViewTest(TestBase):
-    @patch('documentsManager.views.render_to_string')
-    def test_accept_invitation_state(self, mock_render_to_string):
-        mock_render_to_string.return_value = render_to_string('empty.html', {})
+    @patch('documentsManager.views.render_email')
+    def test_accept_invitation_state(self, mock_render_email):
+        mock_render_email.return_value = (render_to_string('empty.html', {}), '')
         event = self.create_event()
         evaluator = self.create_evaluator()
         evaluator_event = EvaluatorEvent.objects.create(
@@ -1756,6 +1847,21 @@ class DashboardView(TestBase):
         response = self.client.get('')
         self.assertEqual(response.status_code, 200)
 
+    @patch('documentsManager.eventbrite_client.EventbriteClient.get')
+    def test_home_lists_managed_events_from_local_rows(
+            self, mock_api_evb, mock_create_order_webhook_from_view):
+        mock_api_evb.return_value = MOCK_EVENTS_API
+        event = self.create_event(eb_event_id=MOCK_EVENTS_API['id'])
+        response = self.client.get('/')
+        self.assertEqual(
+            [(ev['id'], ev['name']) for ev in response.context['events']],
+            [(event.id, MOCK_EVENTS_API['name']['text'])],
+        )
+        self.assertEqual(mock_api_evb.call_count, 1)
+        self.assertEqual(mock_api_evb.call_args[0][0], '/events/{}/'.format(MOCK_EVENTS_API['id']))
+        self.client.get('/')
+        self.assertEqual(mock_api_evb.call_count, 1)
+
     def test_home_resolve_home_not_args(self, mock_create_order_webhook_from_view):
         found = resolve('/')
         self.assertEqual(found.args, ())
@@ -1766,14 +1872,6 @@ class DashboardView(TestBase):
 
 
 class UtilsTest(TestBase):
-    def test_social_user_exists_not_valid(self):
-        result = social_user_exists(1)
-        self.assertEqual(result, False)
-
-    def test_social_user_exists_valid(self):
-        result = social_user_exists(self.auth.uid)
-        self.assertEqual(result, True)
-
     def test_get_data_utils_invalid(self):
         body = {
             'config': {
@@ -1796,33 +1894,24 @@ class UtilsTest(TestBase):
         result = webhook_available_to_process(self.auth.uid)
         self.assertEqual(result, True)
 
-    def test_get_social_user_not_valid(self):
-        result = get_social_user(1)
-        expected = None
-        self.assertEqual(result, expected)
-
-    def test_get_social_user_valid(self):
-        result = get_social_user(self.auth.uid)
-        self.assertTrue(isinstance(result, UserSocialAuth))
-
-    def test_send_email_to_attende_not_valid(self):
+    def test_send_emails_to_attendees_not_valid(self):
         context = {
             'host': '',
             'code': 'example',
             'event': 1,
             'id': 1,
         }
-        result = send_email_to_attende('', context)
+        result = send_emails_to_attendees([('', context)])
         self.assertEqual(result, 0)
 
-    def test_send_email_to_attende(self):
+    def test_send_emails_to_attendees(self):
         context = {
             'host': '',
             'code': 'example',
             'event': 1,
             'id': 1,
         }
-        result = send_email_to_attende('familiambc1o@gmail.com', context)
+        result = send_emails_to_attendees([('familiambc1o@gmail.com', context)])
         self.assertEqual(result, 1)
 
     @patch('documentsManager.utils.create_webhook')
@@ -1843,28 +1932,18 @@ class UtilsTest(TestBase):
         result = get_eventbrite_data(access_token, url)
         self.assertTrue(isinstance(result, dict))
 
-    @patch('documentsManager.utils.Eventbrite.get')
+    @patch('documentsManager.eventbrite_client.EventbriteClient.get')
     def test_get_parsed_event_without_venue(self, mock):
         mock.return_value = MOCK_EVENTS_API
         result = get_parsed_event('access_token', 1)
         self.assertTrue(isinstance(result, dict))
 
-    @patch('documentsManager.utils.Eventbrite.get')
+    @patch('documentsManager.eventbrite_client.EventbriteClient.get')
     def test_get_parsed_event_with_venue(self, mock):
         mock.return_value = MOCK_EVENTS_API_2
         result = get_parsed_event('access_token', 1)
         self.assertTrue(isinstance(result, dict))
 
-    def test_create_attendee_code(self):
-        init_a = Attendee.objects.count()
-        init_ac = AttendeeCode.objects.count()
-        event = self.create_event()
-        create_attendee_code('leo@leo.com', 'leonardo araoz', event)
-        end_a = Attendee.objects.count()
-        end_ac = AttendeeCode.objects.count()
-        self.assertGreater(end_a, init_a)
-        self.assertGreater(end_ac, init_ac)
-
     def test_create_order_webhook_from_view_wrong(self):
         user = User.objects.create_user('leo@leo.com')
         webhook_id = 1
@@ -1878,6 +1957,432 @@ class UtilsTest(TestBase):
         self.assertEqual(result, expected)
 
 
+class EventCacheTest(TestBase):
+
+    @patch('documentsManager.eventbrite_client.EventbriteClient.get')
+    def test_get_one_event_api_is_cached(self, mock_api_evb):
+        mock_api_evb.return_value = MOCK_EVENTS_API
+        get_one_event_api('token', MOCK_EVENTS_API['id'])
+        result = get_one_event_api('token', MOCK_EVENTS_API['id'])
+        self.assertEqual(mock_api_evb.call_count, 1)
+        self.assertEqual(result[0]['id'], MOCK_EVENTS_API['id'])
+
+    @patch('documentsManager.eventbrite_client.EventbriteClient.get')
+    def test_invalidate_event_refetches(self, mock_api_evb):
+        mock_api_evb.return_value = MOCK_EVENTS_API
+        get_one_event_api('token', MOCK_EVENTS_API['id'])
+        invalidate_event(MOCK_EVENTS_API['id'])
+        get_one_event_api('token', MOCK_EVENTS_API['id'])
+        self.assertEqual(mock_api_evb.call_count, 2)
+
+    @patch('documentsManager.eventbrite_client.EventbriteClient.get')
+    def test_error_response_is_not_cached(self, mock_api_evb):
+        mock_api_evb.return_value = {'error': 'NOT_FOUND'}
+        get_one_event_api('token', 1)
+        get_one_event_api('token', 1)
+        self.assertEqual(mock_api_evb.call_count, 2)
+
+
+class EventbriteClientTest(TestCase):
+
+    def tearDown(self):
+        close_clients()
+
+    def test_get_client_reuses_client_per_token(self):
+        client = get_client('token')
+        self.assertTrue(isinstance(client, EventbriteClient))
+        self.assertIs(get_client('token'), client)
+        self.assertIsNot(get_client('other_token'), client)
+
+    def test_get_client_evicts_idle_clients(self):
+        with patch('documentsManager.eventbrite_client.time.time') as mock_time:
+            mock_time.return_value = 0
+            client = get_client('token')
+            mock_time.return_value = 10 ** 6
+            get_client('other_token')
+            self.assertIsNot(get_client('token'), client)
+
+    def test_get_uses_pooled_session(self):
+        client = get_client('token')
+        with patch.object(client.session, 'request') as mock_session_request:
+            mock_session_request.return_value.status_code = 200
+            mock_session_request.return_value.json.return_value = MOCK_EVENTS_API
+            mock_session_request.return_value.url = 'https://www.eventbriteapi.com/v3/events/1/'
+            result = client.get('/events/1/', expand=('venue',))
+        self.assertEqual(result['id'], MOCK_EVENTS_API['id'])
+        self.assertEqual(
+            mock_session_request.call_args[0],
+            ('get', 'https://www.eventbriteapi.com/v3/events/1/'),
+        )
+        self.assertEqual(mock_session_request.call_args[1]['params'], {'expand': 'venue'})
+
+
+class RateLimitTest(TestCase):
+
+    def setUp(self):
+        clear_event_cache()
+
+    def tearDown(self):
+        close_clients()
+
+    def test_try_acquire_consumes_budget(self):
+        before = remaining_budget('token')
+        self.assertEqual(try_acquire('token'), 0)
+        self.assertEqual(remaining_budget('token'), before - 1)
+        self.assertEqual(remaining_budget('other_token'), before)
+
+    def test_budget_survives_event_cache_clear(self):
+        try_acquire('token')
+        before = remaining_budget('token')
+        clear_event_cache()
+        self.assertEqual(remaining_budget('token'), before)
+
+    @patch('documentsManager.rate_limit.EVENTBRITE_INTERACTIVE_RESERVE', 2000)
+    def test_background_yields_to_interactive(self):
+        self.assertGreater(try_acquire('token', background=True), 0)
+        self.assertEqual(try_acquire('token'), 0)
+
+    @patch('documentsManager.eventbrite_client.exhaust')
+    @patch('documentsManager.eventbrite_client.time.sleep')
+    def test_client_retries_honouring_retry_after(self, mock_sleep, mock_exhaust):
+        client = get_client('token')
+        throttled = MagicMock(status_code=429, headers={'Retry-After': '3'})
+        success = MagicMock(status_code=200)
+        with patch.object(client.session, 'request') as mock_request:
+            mock_request.side_effect = [throttled, success]
+            result = client.send('get', 'https://www.eventbriteapi.com/v3/events/1/')
+        self.assertIs(result, success)
+        mock_sleep.assert_called_once_with(3.0)
+        mock_exhaust.assert_called_once_with('token')
+
+    @patch('documentsManager.eventbrite_client.exhaust')
+    @patch('documentsManager.eventbrite_client.time.sleep')
+    def test_interactive_client_does_not_wait_past_budget(self, mock_sleep, mock_exhaust):
+        client = get_client('token')
+        throttled = MagicMock(status_code=429, headers={'Retry-After': '30'})
+        with patch.object(client.session, 'request', return_value=throttled):
+            with self.assertRaises(RateLimited):
+                client.send('get', 'https://www.eventbriteapi.com/v3/events/1/')
+        self.assertFalse(mock_sleep.called)
+
+    @patch('documentsManager.eventbrite_client.EVENTBRITE_MAX_RETRIES', 1)
+    @patch('documentsManager.eventbrite_client.time.sleep')
+    def test_client_raises_after_failed_retries(self, mock_sleep):
+        client = get_client('token')
+        failing = MagicMock(status_code=503, headers={'Retry-After': '1'})
+        with patch.object(client.session, 'request', return_value=failing) as mock_request:
+            with self.assertRaises(EventbriteServerError):
+                client.send('get', 'https://www.eventbriteapi.com/v3/events/1/')
+        self.assertEqual(mock_request.call_count, 2)
+        breaker.reset()
+
+    def test_background_client_raises_when_throttled(self):
+        client = get_client('token')
+        throttled = MagicMock(status_code=429, headers={'Retry-After': '3'})
+        with patch.object(client.session, 'request', return_value=throttled):
+            with background_requests():
+                with self.assertRaises(RateLimited):
+                    client.send('get', 'https://www.eventbriteapi.com/v3/events/1/')
+
+
+class EventsPaginationTest(TestCase):
+
+    PAGES = [
+        {
+            'events': [MOCK_EVENTS_API],
+            'pagination': {'has_more_items': True, 'continuation': 'page2'},
+        },
+        {
+            'events': [MOCK_EVENTS_API_2],
+            'pagination': {'has_more_items': False},
+        },
+    ]
+
+    @patch('documentsManager.eventbrite_client.EventbriteClient.get')
+    def test_iter_events_api_follows_continuation(self, mock_api_evb):
+        mock_api_evb.side_effect = self.PAGES
+        result = list(iter_events_api('token', status='live'))
+        self.assertEqual(
+            [event['id'] for event in result],
+            [MOCK_EVENTS_API['id'], MOCK_EVENTS_API_2['id']],
+        )
+        last_data = mock_api_evb.call_args[1]['data']
+        self.assertEqual(last_data['continuation'], 'page2')
+        self.assertEqual(last_data['status'], 'live')
+
+    @patch('documentsManager.eventbrite_client.EventbriteClient.get')
+    def test_iter_events_api_is_lazy(self, mock_api_evb):
+        mock_api_evb.side_effect = self.PAGES
+        events = iter_events_api('token')
+        next(events)
+        self.assertEqual(mock_api_evb.call_count, 1)
+
+
+class EvaluatorEventsTest(TestBase):
+
+    def setUp(self):
+        super(EvaluatorEventsTest, self).setUp()
+        self.evaluator = self.create_evaluator(email=self.user.email)
+        self.request = MagicMock(user=self.user)
+
+    def accept_event(self, eb_event_id):
+        event = self.create_event(eb_event_id=eb_event_id)
+        EvaluatorEvent.objects.create(
+            event=event,
+            evaluator=self.evaluator,
+            status='accepted',
+        )
+        return event
+
+    @patch('documentsManager.eventbrite_client.EventbriteClient.get')
+    def test_evaluator_events_maps_local_ids(self, mock_api_evb):
+        mock_api_evb.side_effect = lambda path, **kwargs: (
+            MOCK_EVENTS_API if MOCK_EVENTS_API['id'] in path else MOCK_EVENTS_API_2
+        )
+        event_1 = self.accept_event(MOCK_EVENTS_API['id'])
+        event_2 = self.accept_event(MOCK_EVENTS_API_2['id'])
+        result = evaluator_events(self.request)
+        self.assertEqual(mock_api_evb.call_count, 2)
+        self.assertEqual(
+            [(ev['event_id'], ev['eb_id']) for ev in result],
+            [
+                (event_1.id, MOCK_EVENTS_API['id']),
+                (event_2.id, MOCK_EVENTS_API_2['id']),
+            ],
+        )
+
+    @patch('documentsManager.eventbrite_client.EventbriteClient.get')
+    def test_unreachable_event_is_listed_stale(self, mock_api_evb):
+        def get(path, **kwargs):
+            if MOCK_EVENTS_API_2['id'] in path:
+                raise RateLimited(30)
+            return MOCK_EVENTS_API
+        mock_api_evb.side_effect = get
+        event_1 = self.accept_event(MOCK_EVENTS_API['id'])
+        event_2 = self.accept_event(MOCK_EVENTS_API_2['id'])
+        result = evaluator_events(self.request)
+        self.assertEqual(
+            [(ev['event_id'], ev['stale']) for ev in result],
+            [(event_1.id, False), (event_2.id, True)],
+        )
+        self.assertEqual(result[0]['name'], MOCK_EVENTS_API['name']['text'])
+
+    @patch('documentsManager.eventbrite_client.EventbriteClient.get')
+    def test_evaluator_events_skips_pending(self, mock_api_evb):
+        mock_api_evb.return_value = MOCK_EVENTS_API
+        event = self.create_event(eb_event_id=MOCK_EVENTS_API['id'])
+        EvaluatorEvent.objects.create(event=event, evaluator=self.evaluator)
+        self.assertEqual(evaluator_events(self.request), [])
+        self.assertFalse(mock_api_evb.called)
+
+
+class EventSnapshotTest(TestBase):
+
+    def setUp(self):
+        super(EventSnapshotTest, self).setUp()
+        self.event = self.create_event(eb_event_id=MOCK_EVENTS_API_2['id'])
+
+    @patch('documentsManager.utils.get_one_event_api')
+    def test_get_event_snapshot_persists_parsed_event(self, mock_get_one_event_api):
+        mock_get_one_event_api.return_value = [MOCK_EVENTS_API_2]
+        result = get_event_snapshot(self.event)
+        event = Event.objects.get(id=self.event.id)
+        self.assertEqual(result['name'], 'EventoCualquiera2')
+        self.assertEqual(event.name, 'EventoCualquiera2')
+        self.assertEqual(event.eb_venue_id, '123')
+        self.assertTrue(event.has_snapshot)
+
+    @patch('documentsManager.utils.get_one_event_api')
+    def test_get_event_snapshot_without_network(self, mock_get_one_event_api):
+        mock_get_one_event_api.return_value = [MOCK_EVENTS_API_2]
+        get_event_snapshot(self.event)
+        get_event_snapshot(Event.objects.get(id=self.event.id))
+        self.assertEqual(mock_get_one_event_api.call_count, 1)
+
+    @patch('documentsManager.utils.get_one_event_api')
+    def test_event_updated_webhook_refreshes_snapshot(self, mock_get_one_event_api):
+        mock_get_one_event_api.return_value = [MOCK_EVENTS_API_2]
+        get_event_snapshot(self.event)
+        updated_event = dict(MOCK_EVENTS_API_2, name={'text': 'Renamed'})
+        mock_get_one_event_api.return_value = [updated_event]
+        body = {
+            'config': {
+                'action': 'event.updated',
+                'user_id': self.auth.uid,
+            },
+            'api_url': 'https://www.eventbriteapi.com/v3/events/{}/'.format(
+                MOCK_EVENTS_API_2['id']),
+        }
+        result = get_data(body, 'http://algo.com')
+        self.assertTrue(result['status'])
+        self.assertEqual(Event.objects.get(id=self.event.id).name, 'Renamed')
+
+    @patch('documentsManager.utils.get_one_event_api')
+    def test_sweep_skips_ended_events(self, mock_get_one_event_api):
+        mock_get_one_event_api.return_value = [MOCK_EVENTS_API_2]
+        ended = self.create_event(eb_event_id='ended')
+        Event.objects.filter(id=ended.id).update(
+            end=timezone.now() - timedelta(days=1),
+        )
+        call_command('refresh_event_snapshots', stdout=StringIO())
+        self.assertTrue(Event.objects.get(id=self.event.id).has_snapshot)
+        self.assertFalse(Event.objects.get(id=ended.id).has_snapshot)
+
+    @patch('documentsManager.eventbrite_client.EventbriteClient.post')
+    def test_update_webhooks_subscribes_existing_webhooks(self, mock_post):
+        mock_post.return_value = {'id': '77'}
+        UserWebhook.objects.create(user=self.user, webhook_id='77')
+        out = StringIO()
+        call_command('update_webhooks', stdout=out)
+        url, data = mock_post.call_args[0]
+        self.assertEqual(url, '/webhooks/77/')
+        self.assertIn('event.updated', data['actions'])
+        self.assertIn('Updated 1 webhooks.', out.getvalue())
+
+
+class CircuitBreakerTest(TestCase):
+
+    def setUp(self):
+        self.breaker = CircuitBreaker(
+            failure_threshold=2,
+            reset_timeout=30,
+            slow_call_threshold=5,
+        )
+
+    def test_opens_after_repeated_failures(self):
+        self.breaker.record(False, 0.1)
+        self.breaker.before_call()
+        self.breaker.record(False, 0.1)
+        with self.assertRaises(CircuitOpen):
+            self.breaker.before_call()
+
+    def test_slow_calls_count_as_failures(self):
+        self.breaker.record(True, 10)
+        self.breaker.record(True, 10)
+        self.assertTrue(self.breaker.is_open)
+
+    @patch('documentsManager.circuit_breaker.time.time')
+    def test_half_open_trial_closes_circuit(self, mock_time):
+        mock_time.return_value = 0
+        self.breaker.record(False, 0.1)
+        self.breaker.record(False, 0.1)
+        mock_time.return_value = 60
+        self.breaker.before_call()
+        self.breaker.record(True, 0.1)
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+
+class ParsedEventTest(TestCase):
+
+    def test_parses_api_event(self):
+        api_event = dict(
+            MOCK_EVENTS_API_2,
+            venue={'address': {'localized_address_display': 'Mendoza'}},
+        )
+        event = parse_events([api_event])[0]
+        self.assertEqual(event['eb_id'], '50607739120')
+        self.assertEqual(event.start, datetime(2018, 11, 3, 23, 0))
+        self.assertEqual(event['end'], datetime(2018, 11, 4, 2, 0))
+        self.assertEqual(event.eb_event_start, '2018-11-03T23:00:00Z')
+        self.assertEqual(event['venue'], 'Mendoza')
+
+    def test_is_immutable(self):
+        event = parse_events([MOCK_EVENTS_API])[0]
+        with self.assertRaises(AttributeError):
+            event.name = 'Other'
+        with self.assertRaises(TypeError):
+            event['name'] = 'Other'
+        stale = event.replace(stale=True)
+        self.assertTrue(stale['stale'])
+        self.assertFalse(event['stale'])
+        self.assertEqual(stale.name, event.name)
+
+    def test_fields_without_venue(self):
+        event = parse_events([MOCK_EVENTS_API])[0]
+        self.assertEqual(event['venue'], '')
+        self.assertIsNone(event['description'])
+        self.assertEqual(event.get('missing', 'default'), 'default')
+        with self.assertRaises(KeyError):
+            event['missing']
+
+    def test_parse_utc_falls_back_to_strptime(self):
+        self.assertEqual(
+            parse_utc('2018-11-03T23:00:00Z'),
+            datetime(2018, 11, 3, 23, 0),
+        )
+        with self.assertRaises(ValueError):
+            parse_utc('2018-13-03T23:00:00Z')
+
+
+class SingleFlightTest(TestCase):
+
+    def test_concurrent_callers_share_one_call(self):
+        flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+        results = []
+
+        def fetch():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return 'event'
+
+        def call():
+            results.append(flight.do('key', fetch))
+
+        threads = [threading.Thread(target=call) for _ in range(5)]
+        threads[0].start()
+        started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        time.sleep(0.1)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['event'] * 5)
+
+    def test_errors_are_shared_and_not_cached(self):
+        flight = SingleFlight()
+        with self.assertRaises(ValueError):
+            flight.do('key', MagicMock(side_effect=ValueError))
+        self.assertEqual(flight.do('key', lambda: 'event'), 'event')
+
+
+class StaleEventSnapshotTest(TestBase):
+
+    def setUp(self):
+        super(StaleEventSnapshotTest, self).setUp()
+        self.event = self.create_event(eb_event_id=MOCK_EVENTS_API['id'])
+
+    def tearDown(self):
+        breaker.reset()
+
+    @patch('documentsManager.utils.get_one_event_api')
+    def test_open_circuit_renders_stale_event(self, mock_get_one_event_api):
+        mock_get_one_event_api.side_effect = CircuitOpen()
+        result = get_event_snapshot(self.event)
+        self.assertTrue(result['stale'])
+        self.assertEqual(result['eb_id'], MOCK_EVENTS_API['id'])
+
+    @patch('documentsManager.utils.revalidate_in_background')
+    @patch('documentsManager.utils.get_one_event_api')
+    def test_stale_snapshot_is_revalidated(
+            self, mock_get_one_event_api, mock_revalidate_in_background):
+        mock_get_one_event_api.return_value = [MOCK_EVENTS_API]
+        get_event_snapshot(self.event)
+        Event.objects.filter(id=self.event.id).update(
+            snapshot_updated=datetime(2018, 1, 1, tzinfo=timezone.utc))
+        event = Event.objects.get(id=self.event.id)
+        result = get_event_snapshot(event)
+        self.assertTrue(result['stale'])
+        self.assertEqual(result['name'], 'EventoCualquiera')
+        mock_revalidate_in_background.assert_called_once_with(event)
+        self.assertEqual(mock_get_one_event_api.call_count, 1)
+
+
 class AttendeeCodeTest(TestBase):
     def test_create_attendee_code(self):
         event = self.create_event()
@@ -1983,7 +2488,7 @@ class ResultCreateTest(TestBase):
         result = Result.objects.filter(submission=self.file_submission).first()
         self.assertTrue(result.approved)
 
-    @patch('documentsManager.utils.Eventbrite.get')
+    @patch('documentsManager.eventbrite_client.EventbriteClient.get')
     def test_review_create_reject(self, mock_api_evb):
         mock_api_evb.return_value = MOCK_EVENTS_API
         data = {
@@ -2010,3 +2515,801 @@ class ResultCreateTest(TestBase):
                 }
             )
         )
+
+
+class WebhookQueueTest(TestBase):
+
+    BODY = {
+        'config': {
+            'action': 'order.placed',
+            'user_id': '563480245671',
+        },
+        'api_url': 'https://www.eventbriteapi.com/v3/orders/123/',
+    }
+
+    @patch('documentsManager.utils.get_data')
+    def test_accept_webhook_only_enqueues(self, mock_get_data):
+        response = self.client.post(
+            '/webhook-point/',
+            data=json.dumps(self.BODY),
+            content_type='application/json',
+            URL_LOCAL='http://algo.com',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(mock_get_data.called)
+        delivery = WebhookDelivery.objects.get()
+        self.assertEqual(delivery.action, 'order.placed')
+        self.assertEqual(delivery.host, 'http://algo.com')
+        self.assertEqual(delivery.state, 'pending')
+
+    @override_settings(ROOT_URLCONF='post_registration.webhook_urls', MIDDLEWARE=[])
+    def test_lean_webhook_entry_point(self):
+        client = Client()
+        response = client.post(
+            '/webhook-point/',
+            data=json.dumps(self.BODY),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(WebhookDelivery.objects.get().action, 'order.placed')
+        self.assertEqual(client.get('/').status_code, 404)
+
+    def test_accept_webhook_rejects_invalid_payload(self):
+        response = self.client.post(
+            '/webhook-point/',
+            data='not json',
+            content_type='application/json',
+            URL_LOCAL='http://algo.com',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(WebhookDelivery.objects.exists())
+
+    def test_accept_webhook_refuses_internal_actions(self):
+        response = self.client.post(
+            '/webhook-point/',
+            data=json.dumps({
+                'config': {'action': 'results.publish'},
+                'publication_id': 1,
+            }),
+            content_type='application/json',
+            URL_LOCAL='http://algo.com',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(WebhookDelivery.objects.exists())
+
+    @patch('documentsManager.utils.publish_results')
+    def test_worker_only_runs_internal_jobs_marked_internal(self, mock_publish_results):
+        WebhookDelivery.objects.create(
+            payload=json.dumps({
+                'config': {'action': 'results.publish'},
+                'publication_id': 1,
+            }),
+            action='results.publish',
+        )
+        call_command('process_webhooks', window=0, stdout=StringIO())
+        self.assertFalse(mock_publish_results.called)
+
+    @patch('documentsManager.management.commands.process_webhooks.get_data')
+    def test_process_webhooks_drains_queue(self, mock_get_data):
+        body = dict(self.BODY, config={'action': 'event.updated', 'user_id': '1'})
+        enqueue_webhook(json.dumps(body), 'http://algo.com')
+        call_command('process_webhooks', window=0, stdout=StringIO())
+        mock_get_data.assert_called_once_with(body, 'http://algo.com')
+        delivery = WebhookDelivery.objects.get()
+        self.assertEqual(delivery.state, 'done')
+        self.assertEqual(delivery.attempts, 1)
+
+    def test_failed_delivery_is_retried_later(self):
+        enqueue_webhook(json.dumps(self.BODY), 'http://algo.com')
+        delivery = claim_deliveries(10)[0]
+        process_delivery(delivery, MagicMock(side_effect=RateLimited(60)))
+        delivery = WebhookDelivery.objects.get()
+        self.assertEqual(delivery.state, 'pending')
+        self.assertGreater(delivery.available_at, timezone.now())
+        self.assertIn('RateLimited', delivery.last_error)
+        self.assertEqual(claim_deliveries(10), [])
+
+    def test_delivery_is_dead_lettered_after_max_attempts(self):
+        WebhookDelivery.objects.create(
+            payload=json.dumps(self.BODY),
+            attempts=WEBHOOK_MAX_ATTEMPTS - 1,
+        )
+        delivery = claim_deliveries(10)[0]
+        process_delivery(delivery, MagicMock(side_effect=ValueError('boom')))
+        self.assertEqual(WebhookDelivery.objects.get().state, 'dead')
+
+
+class WebhookLedgerTest(TestBase):
+
+    def setUp(self):
+        super(WebhookLedgerTest, self).setUp()
+        self.event = self.create_event(eb_event_id=MOCK_EVENTS_API['id'])
+        self.body = {
+            'config': {
+                'action': 'order.placed',
+                'user_id': self.auth.uid,
+            },
+            'api_url': 'https://www.eventbriteapi.com/v3/orders/123/',
+        }
+
+    def deliver(self):
+        return enqueue_webhook(json.dumps(self.body), 'http://algo.com')
+
+    @patch('documentsManager.utils.send_emails_to_attendees')
+    @patch('documentsManager.utils.get_parsed_event')
+    @patch('documentsManager.utils.get_eventbrite_data')
+    def test_redelivered_order_is_processed_once(
+            self, mock_get_eventbrite_data, mock_get_parsed_event, mock_send_email):
+        mock_get_eventbrite_data.return_value = {
+            'event_id': MOCK_EVENTS_API['id'],
+            'email': 'buyer@email.com',
+            'name': 'Buyer',
+        }
+        mock_get_parsed_event.return_value = ParsedEvent(eb_id=MOCK_EVENTS_API['id'])
+        self.assertEqual(process_order_webhooks([self.deliver()]), {})
+        redelivery = self.deliver()
+        with self.assertNumQueries(1):
+            self.assertEqual(process_order_webhooks([redelivery]), {})
+        self.assertEqual(mock_get_eventbrite_data.call_count, 1)
+        self.assertEqual(mock_send_email.call_count, 1)
+        self.assertEqual(AttendeeCode.objects.filter(event=self.event).count(), 1)
+
+    @patch('documentsManager.utils.get_eventbrite_data')
+    def test_failed_order_is_released_for_retry(self, mock_get_eventbrite_data):
+        mock_get_eventbrite_data.side_effect = RateLimited(10)
+        delivery = self.deliver()
+        errors = process_order_webhooks([delivery])
+        self.assertIsInstance(errors[delivery.id], RateLimited)
+        self.assertFalse(WebhookLedger.objects.exists())
+
+    @patch('documentsManager.utils.send_emails_to_attendees')
+    @patch('documentsManager.utils.get_parsed_event')
+    @patch('documentsManager.utils.get_eventbrite_data')
+    def test_order_interrupted_while_stored_is_not_lost(
+            self, mock_get_eventbrite_data, mock_get_parsed_event, mock_send_email):
+        mock_get_eventbrite_data.return_value = {
+            'event_id': MOCK_EVENTS_API['id'],
+            'email': 'buyer@email.com',
+            'name': 'Buyer',
+        }
+        mock_get_parsed_event.return_value = ParsedEvent(eb_id=MOCK_EVENTS_API['id'])
+        mock_send_email.side_effect = DataError('worker died')
+        delivery = self.deliver()
+        self.assertIn(delivery.id, process_order_webhooks([delivery]))
+        self.assertFalse(WebhookLedger.objects.exists())
+        self.assertFalse(AttendeeCode.objects.filter(event=self.event).exists())
+        mock_send_email.side_effect = None
+        self.assertEqual(process_order_webhooks([delivery]), {})
+        self.assertEqual(WebhookLedger.objects.count(), 1)
+        self.assertEqual(AttendeeCode.objects.filter(event=self.event).count(), 1)
+
+
+class WebhookBatchTest(TestBase):
+
+    def setUp(self):
+        super(WebhookBatchTest, self).setUp()
+        self.event = self.create_event(eb_event_id=MOCK_EVENTS_API['id'])
+        for order_id in ('1', '2', '3'):
+            enqueue_webhook(json.dumps({
+                'config': {
+                    'action': 'order.placed',
+                    'user_id': self.auth.uid,
+                },
+                'api_url': 'https://www.eventbriteapi.com/v3/orders/{}/'.format(order_id),
+            }), 'http://algo.com')
+
+    def order(self, token, url_base, expand=()):
+        order_id = url_base.rstrip('/').split('/')[-1]
+        return {
+            'event_id': MOCK_EVENTS_API['id'],
+            'email': 'buyer{}@email.com'.format(order_id),
+            'name': 'Buyer {}'.format(order_id),
+        }
+
+    @patch('documentsManager.utils.get_parsed_event')
+    @patch('documentsManager.utils.get_eventbrite_data')
+    def test_group_order_creates_a_code_per_attendee(
+            self, mock_get_eventbrite_data, mock_get_parsed_event):
+        def order(token, url_base, expand=()):
+            self.assertEqual(expand, ('attendees',))
+            return dict(self.order(token, url_base), attendees=[
+                {'id': url_base[-2] + '1', 'profile': {'name': 'Ann', 'email': 'ann@email.com'}},
+                {'id': url_base[-2] + '2', 'profile': {'name': 'Bob', 'email': 'bob@email.com'}},
+                {'id': url_base[-2] + '3', 'profile': {}, 'refunded': True},
+            ])
+        mock_get_eventbrite_data.side_effect = order
+        mock_get_parsed_event.return_value = ParsedEvent(eb_id=MOCK_EVENTS_API['id'])
+        call_command('process_webhooks', window=0, stdout=StringIO())
+        codes = AttendeeCode.objects.filter(event=self.event)
+        self.assertEqual(codes.count(), 6)
+        self.assertEqual(
+            sorted(codes.values_list('attendee__eb_user_id', flat=True)),
+            ['11', '12', '21', '22', '31', '32'],
+        )
+        call_command('send_emails', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 6)
+
+    @patch('documentsManager.utils.get_parsed_event')
+    @patch('documentsManager.utils.get_eventbrite_data')
+    def test_orders_for_one_event_share_a_batch(
+            self, mock_get_eventbrite_data, mock_get_parsed_event):
+        mock_get_eventbrite_data.side_effect = self.order
+        mock_get_parsed_event.return_value = ParsedEvent(eb_id=MOCK_EVENTS_API['id'])
+        call_command('process_webhooks', window=0, stdout=StringIO())
+        self.assertEqual(mock_get_eventbrite_data.call_count, 3)
+        self.assertEqual(mock_get_parsed_event.call_count, 1)
+        self.assertEqual(AttendeeCode.objects.filter(event=self.event).count(), 3)
+        call_command('send_emails', stdout=StringIO())
+        self.assertEqual(
+            sorted(message.to[0] for message in mail.outbox),
+            ['buyer1@email.com', 'buyer2@email.com', 'buyer3@email.com'],
+        )
+        self.assertEqual(WebhookDelivery.objects.filter(state='done').count(), 3)
+
+    @patch('documentsManager.utils.get_parsed_event')
+    @patch('documentsManager.utils.get_eventbrite_data')
+    def test_failed_order_does_not_fail_the_batch(
+            self, mock_get_eventbrite_data, mock_get_parsed_event):
+        def order(token, url_base, expand=()):
+            if url_base.endswith('/2/'):
+                raise RateLimited(30)
+            return self.order(token, url_base, expand)
+        mock_get_eventbrite_data.side_effect = order
+        mock_get_parsed_event.return_value = ParsedEvent(eb_id=MOCK_EVENTS_API['id'])
+        call_command('process_webhooks', window=0, stdout=StringIO())
+        self.assertEqual(AttendeeCode.objects.filter(event=self.event).count(), 2)
+        self.assertEqual(WebhookDelivery.objects.filter(state='pending').count(), 1)
+        self.assertEqual(WebhookLedger.objects.count(), 2)
+
+    @patch('documentsManager.utils.get_parsed_event')
+    @patch('documentsManager.utils.get_eventbrite_data')
+    def test_orders_of_unmanaged_events_are_done_without_fetching(
+            self, mock_get_eventbrite_data, mock_get_parsed_event):
+        mock_get_eventbrite_data.side_effect = lambda token, url_base, expand=(): dict(
+            self.order(token, url_base), event_id='not-managed')
+        call_command('process_webhooks', window=0, stdout=StringIO())
+        self.assertFalse(mock_get_parsed_event.called)
+        self.assertEqual(WebhookDelivery.objects.filter(state='done').count(), 3)
+        self.assertFalse(AttendeeCode.objects.exists())
+
+
+class ImportAttendeesTest(TestBase):
+
+    PAGES = [
+        {
+            'attendees': [
+                {'id': 'a1', 'profile': {'name': 'Ann', 'email': 'ann@email.com'}},
+                {'id': 'a2', 'profile': {'name': 'Bob', 'email': 'bob@email.com'}},
+            ],
+            'pagination': {'has_more_items': True, 'continuation': 'page2'},
+        },
+        {
+            'attendees': [
+                {'id': 'a3', 'profile': {'name': 'Cat', 'email': 'cat@email.com'}},
+                {'id': 'a4', 'profile': {'name': 'Dan', 'email': 'dan@email.com'}, 'cancelled': True},
+            ],
+            'pagination': {'has_more_items': False},
+        },
+    ]
+
+    def setUp(self):
+        super(ImportAttendeesTest, self).setUp()
+        self.event = self.create_event(eb_event_id=MOCK_EVENTS_API['id'])
+
+    ORDER = {
+        'event_id': MOCK_EVENTS_API['id'],
+        'email': 'ann@email.com',
+        'name': 'Ann',
+        'attendees': [
+            {'id': 'a1', 'profile': {'name': 'Ann', 'email': 'ann@email.com'}},
+            {'id': 'a5', 'profile': {'name': 'Eve', 'email': 'eve@email.com'}},
+        ],
+    }
+
+    def reconciled(self):
+        AttendeeCode.objects.create(
+            attendee=Attendee.objects.create(name='Ann', email='ann@email.com', eb_user_id='a1'),
+            event=self.event,
+        )
+
+    @patch('documentsManager.utils.get_parsed_event')
+    @patch('documentsManager.utils.get_eventbrite_data')
+    def test_batched_order_after_reconcile_skips_imported_attendees(
+            self, mock_get_eventbrite_data, mock_get_parsed_event):
+        self.reconciled()
+        mock_get_eventbrite_data.return_value = self.ORDER
+        mock_get_parsed_event.return_value = ParsedEvent(eb_id=MOCK_EVENTS_API['id'])
+        enqueue_webhook(json.dumps({
+            'config': {'action': 'order.placed', 'user_id': self.auth.uid},
+            'api_url': 'https://www.eventbriteapi.com/v3/orders/9/',
+        }), 'http://algo.com')
+        call_command('process_webhooks', window=0, stdout=StringIO())
+        self.assertEqual(AttendeeCode.objects.filter(event=self.event).count(), 2)
+        self.assertEqual(list(OutboundEmail.objects.values_list('to', flat=True)), ['eve@email.com'])
+
+    @patch('documentsManager.utils.get_event_snapshot')
+    @patch('documentsManager.eventbrite_client.EventbriteClient.get')
+    def test_import_skips_attendees_with_codes(self, mock_api_evb, mock_snapshot):
+        mock_api_evb.side_effect = self.PAGES
+        mock_snapshot.return_value = ParsedEvent(eb_id=MOCK_EVENTS_API['id'])
+        AttendeeCode.objects.create(
+            attendee=Attendee.objects.create(name='Ann', email='ann@email.com', eb_user_id='a1'),
+            event=self.event,
+        )
+        imported = import_event_attendees(self.event, 'http://algo.com', chunk_size=1)
+        self.assertEqual(imported, 2)
+        self.assertEqual(
+            sorted(AttendeeCode.objects.filter(event=self.event).values_list(
+                'attendee__eb_user_id', flat=True)),
+            ['a1', 'a2', 'a3'],
+        )
+        call_command('send_emails', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 2)
+        mock_api_evb.side_effect = self.PAGES
+        self.assertEqual(import_event_attendees(self.event, 'http://algo.com'), 0)
+
+    def test_organizer_queues_import(self):
+        response = self.client.post(
+            reverse('import-attendees', kwargs={'event_id': self.event.id}))
+        self.assertEqual(response.status_code, 302)
+        delivery = WebhookDelivery.objects.get()
+        self.assertEqual(delivery.action, 'attendees.import')
+        self.assertTrue(delivery.internal)
+        self.assertEqual(json.loads(delivery.payload)['event_id'], self.event.id)
+
+    def test_pending_import_is_not_queued_again(self):
+        url = reverse('import-attendees', kwargs={'event_id': self.event.id})
+        self.client.post(url)
+        self.client.post(url)
+        self.assertEqual(WebhookDelivery.objects.count(), 1)
+        WebhookDelivery.objects.update(state='done')
+        self.client.post(url)
+        self.assertEqual(WebhookDelivery.objects.count(), 2)
+
+    def test_only_organizer_can_import(self):
+        other = User.objects.create_user(email='other@email.com', password='awesome1234')
+        event = Event.objects.create(eb_event_id='777', organizer=other)
+        response = self.client.post(
+            reverse('import-attendees', kwargs={'event_id': event.id}))
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(WebhookDelivery.objects.exists())
+
+    @patch('documentsManager.utils.get_event_snapshot')
+    @patch('documentsManager.eventbrite_client.EventbriteClient.get')
+    def test_reconcile_sweeps_changes_since_cursor(self, mock_api_evb, mock_snapshot):
+        mock_api_evb.side_effect = self.PAGES
+        mock_snapshot.return_value = ParsedEvent(eb_id=MOCK_EVENTS_API['id'])
+        self.event.attendees_synced = datetime(2018, 11, 1, 12, 0, tzinfo=timezone.utc)
+        self.event.save()
+        AttendeeCode.objects.create(
+            attendee=Attendee.objects.create(name='Bob', email='bob@email.com', eb_user_id='a2'),
+            event=self.event,
+        )
+        call_command('reconcile_attendees', host='http://algo.com', stdout=StringIO())
+        self.assertEqual(
+            mock_api_evb.call_args_list[0][1]['data']['changed_since'],
+            '2018-11-01T12:00:00Z',
+        )
+        self.assertEqual(
+            sorted(AttendeeCode.objects.filter(event=self.event).values_list(
+                'attendee__eb_user_id', flat=True)),
+            ['a1', 'a2', 'a3'],
+        )
+        event = Event.objects.get(id=self.event.id)
+        self.assertGreater(event.attendees_synced, self.event.attendees_synced)
+
+    @patch('documentsManager.utils.get_event_snapshot')
+    @patch('documentsManager.eventbrite_client.EventbriteClient.get')
+    def test_failed_sweep_keeps_cursor(self, mock_api_evb, mock_snapshot):
+        mock_api_evb.side_effect = [
+            self.PAGES[0],
+            {'status_code': 400, 'error': 'ARGUMENTS_ERROR'},
+        ]
+        mock_snapshot.return_value = ParsedEvent(eb_id=MOCK_EVENTS_API['id'])
+        synced = datetime(2018, 11, 1, 12, 0, tzinfo=timezone.utc)
+        self.event.attendees_synced = synced
+        self.event.save()
+        call_command('reconcile_attendees', host='http://algo.com', stdout=StringIO())
+        self.assertEqual(Event.objects.get(id=self.event.id).attendees_synced, synced)
+        self.assertFalse(AttendeeCode.objects.exists())
+
+    def test_adopted_event_starts_cursor(self):
+        event = add_event('888', timezone.now(), self.user)
+        self.assertIsNotNone(event.attendees_synced)
+
+
+class OrganizerTokensTest(TestBase):
+
+    def test_webhook_gating_uses_the_index(self):
+        self.assertTrue(webhook_available_to_process(self.auth.uid))
+        with self.assertNumQueries(0):
+            self.assertTrue(webhook_available_to_process(self.auth.uid))
+            self.assertEqual(
+                get_access_token_form_user_id(self.auth.uid),
+                'hsadfkjashdbfkjahsdbf',
+            )
+
+    def test_saving_social_auth_clears_the_index(self):
+        self.assertEqual(get_access_token_form_user_id(self.auth.uid), 'hsadfkjashdbfkjahsdbf')
+        self.auth.extra_data['access_token'] = 'new-token'
+        self.auth.save()
+        self.assertEqual(get_access_token_form_user_id(self.auth.uid), 'new-token')
+        self.auth.delete()
+        self.assertFalse(webhook_available_to_process(self.auth.uid))
+
+    def test_organizer_connected_elsewhere_is_found(self):
+        self.assertFalse(webhook_available_to_process('999'))
+        UserSocialAuth.objects.filter(id=self.auth.id).update(uid='999')
+        self.assertTrue(webhook_available_to_process('999'))
+
+
+class WebhookAdmissionTest(TestBase):
+
+    def post_webhook(self):
+        return self.client.post(
+            '/webhook-point/',
+            data=json.dumps(WebhookQueueTest.BODY),
+            content_type='application/json',
+        )
+
+    @patch('documentsManager.webhook_admission.WEBHOOK_QUEUE_MAX_DEPTH', 1)
+    def test_full_queue_is_shed_with_429(self):
+        self.assertEqual(self.post_webhook().status_code, 200)
+        reset_queue_depth()
+        response = self.post_webhook()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '60')
+        self.assertEqual(WebhookDelivery.objects.count(), 1)
+
+    @patch('documentsManager.webhook_admission._in_flight', threading.BoundedSemaphore(0))
+    def test_saturated_endpoint_is_shed_with_503(self):
+        response = self.post_webhook()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '5')
+        self.assertFalse(WebhookDelivery.objects.exists())
+
+    def test_metrics_report_accepted_and_queue_depth(self):
+        flush_metrics()
+        before = get_metrics()
+        self.post_webhook()
+        flush_metrics()
+        after = get_metrics()
+        self.assertEqual(after['accepted'], before['accepted'] + 1)
+        self.assertEqual(after['queue_depth'], 1)
+
+
+class WebhookJournalTest(TestBase):
+
+    def test_journal_round_trip(self):
+        enqueue_webhook(json.dumps(WebhookQueueTest.BODY).encode('utf-8'), 'http://algo.com')
+        output = StringIO()
+        self.assertEqual(write_journal(iter_journal(), output), 1)
+        output.seek(0)
+        record, = read_journal(output)
+        self.assertEqual(record['host'], 'http://algo.com')
+        self.assertEqual(json.loads(record['payload']), WebhookQueueTest.BODY)
+
+    def test_internal_jobs_are_not_journaled(self):
+        publication = ResultPublication.objects.create(event=self.create_event())
+        enqueue_results_publication(publication)
+        self.assertEqual(list(iter_journal()), [])
+
+    def test_payloads_are_pointed_at_the_stand_in(self):
+        body = to_stand_in(dict(WebhookQueueTest.BODY), 'http://localhost:8080/v3/')
+        self.assertEqual(body['api_url'], 'http://localhost:8080/v3/orders/123/')
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 51)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([], 90), 0)
+
+
+class OutboxTest(TestBase):
+
+    def queue(self, *emails):
+        send_emails_to_attendees([
+            (email, {'host': '', 'code': 'example', 'event': 1, 'id': 1})
+            for email in emails
+        ])
+
+    def test_emails_wait_for_the_worker(self):
+        self.queue('ann@email.com')
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(OutboundEmail.objects.get().state, 'pending')
+        call_command('send_emails', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['ann@email.com'])
+        self.assertEqual(mail.outbox[0].alternatives[0][1], 'text/html')
+        self.assertEqual(OutboundEmail.objects.get().state, 'sent')
+
+    def test_batch_shares_one_connection(self):
+        self.queue('ann@email.com', 'bob@email.com')
+        connection = MagicMock()
+        connection.send_messages.return_value = 1
+        self.assertEqual(send_emails(claim_emails(10), connection), 2)
+        self.assertEqual(connection.open.call_count, 1)
+        self.assertEqual(connection.send_messages.call_count, 2)
+
+    def test_failed_recipient_is_retried_alone(self):
+        self.queue('ann@email.com', 'bob@email.com')
+        connection = MagicMock()
+        connection.send_messages.side_effect = [Exception('timeout'), 1]
+        self.assertEqual(send_emails(claim_emails(10), connection), 1)
+        ann = OutboundEmail.objects.get(to='ann@email.com')
+        self.assertEqual(ann.state, 'pending')
+        self.assertIn('timeout', ann.last_error)
+        self.assertGreater(ann.available_at, timezone.now())
+        self.assertEqual(OutboundEmail.objects.get(to='bob@email.com').state, 'sent')
+
+    def test_connection_failure_releases_the_batch(self):
+        self.queue('ann@email.com', 'bob@email.com')
+        connection = MagicMock()
+        connection.open.side_effect = Exception('refused')
+        self.assertEqual(send_emails(claim_emails(10), connection), 0)
+        self.assertEqual(connection.send_messages.call_count, 0)
+        for email in OutboundEmail.objects.all():
+            self.assertEqual(email.state, 'pending')
+            self.assertIn('refused', email.last_error)
+
+    def test_failed_reconnect_releases_the_rest(self):
+        self.queue('ann@email.com', 'bob@email.com', 'cid@email.com')
+        connection = MagicMock()
+        connection.open.side_effect = [None, Exception('refused')]
+        connection.send_messages.side_effect = [Exception('timeout')]
+        self.assertEqual(send_emails(claim_emails(10), connection), 0)
+        self.assertEqual(connection.send_messages.call_count, 1)
+        self.assertIn('timeout', OutboundEmail.objects.get(to='ann@email.com').last_error)
+        for email in OutboundEmail.objects.exclude(to='ann@email.com'):
+            self.assertEqual(email.state, 'pending')
+            self.assertIn('refused', email.last_error)
+
+    def test_unsent_message_is_retried(self):
+        self.queue('ann@email.com', 'bob@email.com')
+        connection = MagicMock()
+        connection.send_messages.side_effect = [0, 1]
+        self.assertEqual(send_emails(claim_emails(10), connection), 1)
+        ann = OutboundEmail.objects.get(to='ann@email.com')
+        self.assertEqual(ann.state, 'pending')
+        self.assertIn('not sent', ann.last_error)
+        self.assertEqual(OutboundEmail.objects.get(to='bob@email.com').state, 'sent')
+
+    def test_discarded_emails_never_reach_the_outbox(self):
+        with discard_emails():
+            self.queue('ann@email.com')
+        self.assertFalse(OutboundEmail.objects.exists())
+        self.queue('bob@email.com')
+        self.assertEqual(OutboundEmail.objects.count(), 1)
+
+    def test_email_is_rolled_back_with_its_change(self):
+        try:
+            with transaction.atomic():
+                self.queue('ann@email.com')
+                raise DataError('boom')
+        except DataError:
+            pass
+        self.assertFalse(OutboundEmail.objects.exists())
+
+
+class EmailTemplatesTest(TestCase):
+
+    CONTEXT = {
+        'name': 'Ann',
+        'event': {'name': 'PyCon', 'logo': 'http://logo.png'},
+        'host': 'http://algo.com',
+        'id': 1,
+        'code': '5bd0a7d6-c5e5-4d4e-95d7-5a8b0d2a39c5',
+    }
+
+    def setUp(self):
+        clear_email_templates()
+
+    def test_css_is_inlined_into_the_template(self):
+        html, text = render_email('email/email_attende.html', self.CONTEXT)
+        self.assertNotIn('inlinecss', html)
+        self.assertIn('style="', html)
+        self.assertIn('Ann: Thanks For buying a ticket', html)
+        self.assertIn('http://algo.com/', html)
+        self.assertIn('Ann: Thanks For buying a ticket', text)
+        self.assertNotIn('<', text)
+
+    @patch('documentsManager.email_templates.Pynliner')
+    def test_stylesheet_is_inlined_once(self, mock_pynliner):
+        mock_pynliner.return_value.from_string.return_value.with_cssString.return_value.run.return_value = (
+            '<p>{{ name }}</p>')
+        render_email('email/email_attende.html', self.CONTEXT)
+        html, text = render_email('email/email_attende.html', dict(self.CONTEXT, name='Bob'))
+        self.assertEqual(mock_pynliner.call_count, 1)
+        self.assertIn('<p>Bob</p>', html)
+        self.assertIn('Bob', text)
+
+
+class EvaluatorBulkInviteTest(TestBase):
+
+    def setUp(self):
+        super(EvaluatorBulkInviteTest, self).setUp()
+        self.event = self.create_event()
+
+    def invite(self, **data):
+        return self.client.post(
+            reverse('evaluator_bulk_create', kwargs={'event_id': self.event.id}),
+            data,
+        )
+
+    @patch('documentsManager.views.get_event_snapshot')
+    def test_invites_pasted_and_uploaded_evaluators(self, mock_get_event_snapshot):
+        mock_get_event_snapshot.return_value = ParsedEvent(eb_id='1', name='PyCon')
+        existing = self.create_evaluator()
+        csv_file = SimpleUploadedFile('evaluators.csv', b'name,email\nBob,bob@email.com\n')
+        response = self.invite(
+            evaluators='John,john@email.com\nann@email.com\nnot an email',
+            csv_file=csv_file,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mock_get_event_snapshot.call_count, 1)
+        self.assertEqual(
+            list(response.context_data['outcomes'].items()),
+            [('john@email.com', 'invited'), ('ann@email.com', 'invited'), ('bob@email.com', 'invited')],
+        )
+        self.assertEqual(len(response.context_data['invalid_rows']), 1)
+        self.assertEqual(Evaluator.objects.get(email='ann@email.com').name, 'ann')
+        self.assertEqual(Evaluator.objects.get(email='john@email.com'), existing)
+        self.assertEqual(EvaluatorEvent.objects.filter(event=self.event).count(), 3)
+        self.assertEqual(OutboundEmail.objects.count(), 3)
+        self.assertIn('/accept-invitation/', OutboundEmail.objects.first().html)
+
+    @patch('documentsManager.views.get_event_snapshot')
+    def test_evaluators_are_invited_once(self, mock_get_event_snapshot):
+        mock_get_event_snapshot.return_value = ParsedEvent(eb_id='1', name='PyCon')
+        self.invite(evaluators='ann@email.com')
+        response = self.invite(evaluators='ann@email.com\nbob@email.com')
+        self.assertEqual(
+            list(response.context_data['outcomes'].items()),
+            [('ann@email.com', 'already invited'), ('bob@email.com', 'invited')],
+        )
+        self.assertEqual(EvaluatorEvent.objects.filter(event=self.event).count(), 2)
+        self.assertEqual(OutboundEmail.objects.count(), 2)
+
+    def test_empty_invitation_is_rejected(self):
+        response = self.invite(evaluators='')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.context_data['form'].is_valid())
+        self.assertFalse(EvaluatorEvent.objects.exists())
+
+
+class ReviewDigestTest(TestBase):
+
+    def setUp(self):
+        super(ReviewDigestTest, self).setUp()
+        self.event = self.create_event()
+        self.other_event = self.create_event(eb_event_id=2)
+        self.evaluator = self.create_evaluator()
+        self.submissions = [
+            Submission.objects.create(event=event, attendee=self.attendee)
+            for event in (self.event, self.event, self.other_event)
+        ]
+
+    def review(self, submission, approved=True):
+        review = Review.objects.create(
+            evaluator=self.evaluator,
+            submission=submission,
+            approved=approved,
+        )
+        send_evaluator_decision_to_organizer(submission.event_id, review)
+        return review
+
+    def test_immediate_policy_sends_one_email_per_review(self):
+        self.review(self.submissions[0])
+        self.assertEqual(OutboundEmail.objects.count(), 1)
+        self.assertEqual(send_review_digests(), 0)
+
+    def test_digest_collapses_reviews_per_organizer(self):
+        Event.objects.update(review_notifications='hourly')
+        for submission in self.submissions:
+            self.review(submission)
+        self.assertFalse(OutboundEmail.objects.exists())
+        self.assertEqual(send_review_digests('http://algo.com'), 1)
+        digest = OutboundEmail.objects.get()
+        self.assertEqual(digest.to, self.user.email)
+        self.assertIn('2 reviews', digest.body)
+        self.assertIn('http://algo.com', digest.html)
+        self.assertFalse(Review.objects.filter(organizer_notified=False).exists())
+        self.assertEqual(send_review_digests(), 0)
+
+    def test_anonymous_policy_change_redirects_to_login(self):
+        self.client.logout()
+        response = self.client.post(
+            reverse('review-notifications', kwargs={'event_id': self.event.id}),
+            {'review_notifications': 'daily'},
+        )
+        self.assertEqual(response.status_code, 302)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.review_notifications, 'immediate')
+
+    def test_digest_waits_for_its_period(self):
+        Event.objects.update(review_notifications='daily')
+        self.review(self.submissions[0])
+        now = timezone.now()
+        self.assertEqual(send_review_digests(now=now), 1)
+        self.review(self.submissions[1])
+        self.assertEqual(send_review_digests(now=now + timedelta(hours=1)), 0)
+        self.assertEqual(send_review_digests(now=now + timedelta(days=1)), 1)
+        self.assertEqual(OutboundEmail.objects.count(), 2)
+
+
+class PublishResultsTest(TestBase):
+
+    def setUp(self):
+        super(PublishResultsTest, self).setUp()
+        self.event = self.create_event()
+        for index, approved in enumerate((True, False, None)):
+            attendee = Attendee.objects.create(
+                name='Attendee {}'.format(index),
+                email='attendee{}@email.com'.format(index),
+            )
+            Result.objects.create(
+                approved=approved,
+                justification='Well argued',
+                submission=Submission.objects.create(event=self.event, attendee=attendee),
+            )
+
+    @patch('documentsManager.utils.get_event_snapshot')
+    def test_organizer_publishes_results(self, mock_get_event_snapshot):
+        mock_get_event_snapshot.return_value = ParsedEvent(eb_id='1', name='PyCon')
+        response = self.client.post(
+            reverse('publish-results', kwargs={'event_id': self.event.id}))
+        self.assertEqual(response.status_code, 302)
+        publication = ResultPublication.objects.get()
+        self.assertEqual((publication.state, publication.total), ('pending', 2))
+        call_command('process_webhooks', window=0, stdout=StringIO())
+        publication.refresh_from_db()
+        self.assertEqual((publication.state, publication.published), ('done', 2))
+        self.assertEqual(publication.progress, 100)
+        self.assertEqual(
+            sorted(OutboundEmail.objects.values_list('to', flat=True)),
+            ['attendee0@email.com', 'attendee1@email.com'],
+        )
+        self.assertIn('accepted', OutboundEmail.objects.get(to='attendee0@email.com').body)
+        self.assertIn('rejected', OutboundEmail.objects.get(to='attendee1@email.com').body)
+
+    @patch('documentsManager.utils.get_event_snapshot')
+    def test_results_are_published_once_in_batches(self, mock_get_event_snapshot):
+        mock_get_event_snapshot.return_value = ParsedEvent(eb_id='1', name='PyCon')
+        publication = ResultPublication.objects.create(event=self.event, total=2)
+        with patch('documentsManager.utils.queue_messages') as mock_queue_messages:
+            self.assertEqual(publish_results(publication, batch_size=1), 2)
+        self.assertEqual(mock_queue_messages.call_count, 2)
+        publication = ResultPublication.objects.create(event=self.event)
+        self.assertEqual(publish_results(publication), 0)
+        self.assertFalse(Result.objects.filter(
+            approved__isnull=False, published_at__isnull=True).exists())
+
+    @patch('documentsManager.utils.get_event_snapshot')
+    def test_publication_in_progress_is_not_started_again(self, mock_get_event_snapshot):
+        mock_get_event_snapshot.return_value = ParsedEvent(eb_id='1', name='PyCon')
+        url = reverse('publish-results', kwargs={'event_id': self.event.id})
+        self.client.post(url)
+        self.client.post(url)
+        self.assertEqual(ResultPublication.objects.count(), 1)
+        self.assertEqual(WebhookDelivery.objects.count(), 1)
+        call_command('process_webhooks', window=0, stdout=StringIO())
+        self.assertEqual(OutboundEmail.objects.count(), 2)
+
+    @patch('documentsManager.utils.publish_results')
+    def test_failed_publication_can_be_published_again(self, mock_publish_results):
+        mock_publish_results.side_effect = ValueError('boom')
+        url = reverse('publish-results', kwargs={'event_id': self.event.id})
+        self.client.post(url)
+        WebhookDelivery.objects.update(attempts=WEBHOOK_MAX_ATTEMPTS - 1)
+        call_command('process_webhooks', window=0, stdout=StringIO())
+        self.assertEqual(WebhookDelivery.objects.get().state, 'dead')
+        self.assertEqual(ResultPublication.objects.get().state, 'failed')
+        self.client.post(url)
+        self.assertEqual(ResultPublication.objects.count(), 2)
+
+    def test_anonymous_publish_redirects_to_login(self):
+        self.client.logout()
+        response = self.client.post(
+            reverse('publish-results', kwargs={'event_id': self.event.id}))
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(ResultPublication.objects.exists())
@@ -6,6 +6,7 @@ from .views import (
     DeclineInvitationView,
     DocFormView,
     DocsView,
+    EvaluatorBulkCreate,
     EvaluatorCreate,
     EvaluatorDelete,
     EvaluatorList,
@@ -14,8 +15,11 @@ from .views import (
     FileDocDelete,
     FileDocUpdate,
     HomeView,
+    ImportAttendeesView,
     LandingView,
+    PublishResultsView,
     ResultCreate,
+    ReviewNotificationsView,
     ReviewView,
     SignUpView,
     SubmissionsList,
@@ -61,6 +65,16 @@ urlpatterns = [
         EvaluatorCreate.as_view(),
         name='evaluator_create'
     ),
+    url(
+        r'^event/(?P<event_id>\d+)/evaluators/notifications/$',
+        ReviewNotificationsView.as_view(),
+        name='review-notifications'
+    ),
+    url(
+        r'^event/(?P<event_id>\d+)/evaluators/invite/$',
+        EvaluatorBulkCreate.as_view(),
+        name='evaluator_bulk_create'
+    ),
     url(
         r'^event/(?P<event_id>\d+)/evaluator/(?P<pk>\d+)/edit/$',
         EvaluatorUpdate.as_view(),
@@ -101,6 +115,11 @@ urlpatterns = [
         DocsView.as_view(),
         name='docs'
     ),
+    url(
+        r'event/(?P<event_id>\d+)/attendees/import/$',
+        ImportAttendeesView.as_view(),
+        name='import-attendees'
+    ),
     url(
         r'events/$',
         EventsView.as_view(),
@@ -136,6 +155,11 @@ urlpatterns = [
         ResultUpdate.as_view(),
         name='result_update'
     ),
+    url(
+        r'event/(?P<event_id>\d+)/results/publish/$',
+        PublishResultsView.as_view(),
+        name='publish-results'
+    ),
     url(
         r'event/(?P<event_id>\d+)/results/$',
         ResultsView.as_view(),
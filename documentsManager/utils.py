@@ -1,89 +1,404 @@
 # -*- coding: utf-8 -*-
 import json
-from datetime import datetime
-from itertools import chain
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from itertools import chain, groupby, islice
+from operator import attrgetter
+from threading import Lock, Thread
 
-import requests
 from django.core import mail
-from django.http import HttpResponseRedirect, HttpResponse
-from django.template.loader import render_to_string
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.http import HttpResponseBadRequest, HttpResponseRedirect, HttpResponse
 from django.urls import reverse
-from django.utils.html import strip_tags
+from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
-from eventbrite import Eventbrite
 from social_django.models import UserSocialAuth
 
 from post_registration.settings import EMAIL_HOST_USER
 from .app_settings import (
+    ATTENDEES_IMPORT_ACTION,
+    ATTENDEES_IMPORT_CHUNK_SIZE,
+    ATTENDEES_RECONCILE_LOOKBACK,
+    EVENT_SNAPSHOT_MAX_AGE,
+    EVENTBRITE_MAX_WORKERS,
+    RESULTS_PUBLISH_ACTION,
+    RESULTS_PUBLISH_BATCH_SIZE,
+    SNAPSHOT_WH_ACTIONS,
     URL_ENDPOINT,
+    URL_LOCAL,
     WH_ACTIONS,
 )
+from .email_templates import render_email
+from .event_cache import (
+    get_cached_event,
+    invalidate_event,
+    is_cacheable,
+)
+from .eventbrite_client import (
+    EVENTBRITE_UNAVAILABLE,
+    EventbriteResponseError,
+    breaker,
+    get_client,
+)
 from .models import (
     TextDoc,
     FileDoc,
     FileSubmission,
-    Evaluator,
-    EvaluatorEvent,
     TextSubmission,
     UserWebhook,
     Event,
     AttendeeCode,
     Attendee,
+    Evaluator,
+    EvaluatorEvent,
+    Result,
+    ResultPublication,
+    Review,
+)
+from .organizer_tokens import get_organizer_token
+from .outbox import (
+    queue_message,
+    queue_messages,
+)
+from .parsed_event import (
+    EB_DATETIME_FORMAT,
+    ParsedEvent,
+)
+from .rate_limit import (
+    background_requests,
+    is_background,
+)
+from .single_flight import SingleFlight
+from .webhook_admission import admission_control
+from .webhook_queue import (
+    enqueue_webhook,
+    ledger_key,
+    record_webhook,
+    webhook_seen,
 )
 
+ORDER_EXPAND = ('attendees',)
+REVIEW_DIGEST_PERIODS = {
+    'hourly': timedelta(hours=1),
+    'daily': timedelta(days=1),
+}
+
+_revalidating = set()
+_revalidating_lock = Lock()
+_snapshot_flight = SingleFlight()
+
 
 def get_data(body, domain):
-    user_id = body['config']['user_id']
-    url_base = body['api_url']
-    response = {
+    # order.placed deliveries are batched, see process_order_webhooks
+    if body['config'].get('action') in SNAPSHOT_WH_ACTIONS:
+        return refresh_snapshot_from_webhook(body)
+    return {
         'status': False,
         'email': False,
     }
-    if webhook_available_to_process(user_id):
-        access_token = get_access_token_form_user_id(user_id)
-        eventbrite_response = get_eventbrite_data(
-            access_token,
-            url_base,
-        )
-        parsed_event = get_parsed_event(
-            access_token,
-            eventbrite_response['event_id'],
-        )
-        event_local = Event.objects.get(eb_event_id=parsed_event['eb_id'])
-        email = eventbrite_response['email']
-        name = eventbrite_response['name']
-        attende_code = create_attendee_code(email, name, event_local)
-        context = {
-            'code': attende_code.code,
-            'event': parsed_event,
-            'id': event_local.id,
-            'host': domain,
-            'name': name,
+
+
+def run_internal_job(body, host):
+    # Jobs queued by the organizer views; the worker only hands it
+    # deliveries marked internal, which accept_webhook never creates.
+    action = body['config']['action']
+    if action == ATTENDEES_IMPORT_ACTION:
+        event = Event.objects.get(id=body['event_id'])
+        return {
+            'status': True,
+            'imported': import_event_attendees(event, host),
         }
-        send_email_to_attende(email, context)
-        response = {
+    if action == RESULTS_PUBLISH_ACTION:
+        publication = ResultPublication.objects.select_related('event').get(
+            id=body['publication_id'])
+        return {
             'status': True,
-            'email': email,
+            'published': publish_results(publication),
         }
-    return response
+    raise ValueError('Unknown internal job: {}'.format(action))
+
+
+def order_attendees(order):
+    # With ORDER_EXPAND the order lists every ticket holder; the buyer is
+    # only used when the attendees were not expanded.
+    if 'attendees' not in order:
+        return [Attendee(email=order['email'], name=order['name'])]
+    return build_attendees(order['attendees'], order['email'], order['name'])
+
+
+def build_attendees(api_attendees, email='', name=''):
+    attendees = []
+    for attendee in api_attendees:
+        if attendee.get('cancelled') or attendee.get('refunded'):
+            continue
+        profile = attendee.get('profile') or {}
+        attendees.append(Attendee(
+            email=profile.get('email') or email,
+            name=profile.get('name') or name,
+            eb_user_id=attendee.get('id') or '',
+        ))
+    return attendees
+
+
+def lock_events(event_ids):
+    # Order batches and attendee imports lock the events they add codes to
+    # before reading existing_attendee_keys, so they take turns per event.
+    # Ordered by id so two batches never wait on each other's rows.
+    return list(Event.objects.select_for_update().filter(
+        id__in=event_ids).order_by('id').values_list('id', flat=True))
+
+
+def existing_attendee_keys(event, attendees):
+    # The eb_user_id of the attendees that already have a code for the
+    # event, or their email for rows stored before ids were kept. Order
+    # webhooks and attendee imports both check it, so whichever runs
+    # second does not create a second code.
+    existing = set()
+    for eb_user_id, email in AttendeeCode.objects.filter(
+            Q(attendee__eb_user_id__in=[attendee.eb_user_id for attendee in attendees]) |
+            Q(attendee__eb_user_id='', attendee__email__in=[attendee.email for attendee in attendees]),
+            event=event,
+    ).values_list('attendee__eb_user_id', 'attendee__email'):
+        existing.add(eb_user_id or email)
+    return existing
+
+
+def without_codes(attendees, existing):
+    return [
+        attendee for attendee in attendees
+        if attendee.eb_user_id not in existing and attendee.email not in existing
+    ]
+
+
+def bulk_create_attendee_codes(entries):
+    # entries are (unsaved Attendee, Event) pairs, stored with two INSERTs
+    with transaction.atomic():
+        Attendee.objects.bulk_create([attendee for attendee, event in entries])
+        return AttendeeCode.objects.bulk_create([
+            AttendeeCode(attendee=attendee, event=event)
+            for attendee, event in entries
+        ])
+
+
+def process_order_webhooks(deliveries):
+    # Handles a batch of queued order.placed webhooks: each order is fetched
+    # once, each event once, and the rows and emails go out together.
+    # Returns {delivery id: error} for the deliveries that should be retried.
+    errors = {}
+    tokens = {}
+    orders = []
+    batched = set()
+    for delivery in deliveries:
+        try:
+            body = json.loads(delivery.payload)
+            url_base = body['api_url']
+            user_id = body['config']['user_id']
+        except (KeyError, TypeError, ValueError) as error:
+            errors[delivery.id] = error
+            continue
+        if ledger_key(url_base) in batched or webhook_seen(url_base):
+            continue
+        if not webhook_available_to_process(user_id):
+            continue
+        try:
+            if user_id not in tokens:
+                tokens[user_id] = get_access_token_form_user_id(user_id)
+        except Exception as error:
+            errors[delivery.id] = error
+            continue
+        batched.add(ledger_key(url_base))
+        orders.append({
+            'delivery': delivery,
+            'url_base': url_base,
+            'token': tokens[user_id],
+        })
+    store_order_batch(orders, errors)
+    return errors
+
 
+def store_order_batch(orders, errors):
 
-def create_attendee_code(email, name, event):
-    attende = Attendee.objects.create(
-        email=email,
-        name=name,
+    def fail(order, error):
+        errors[order['delivery'].id] = error
+
+    responses = map_concurrently(fetch_order, orders)
+    orders_by_event = defaultdict(list)
+    for order, (response, error) in zip(orders, responses):
+        if error is None:
+            try:
+                order['attendees'] = order_attendees(response)
+                eb_event_id = response['event_id']
+            except (KeyError, TypeError) as parse_error:
+                error = parse_error
+        if error is not None:
+            fail(order, error)
+            continue
+        orders_by_event[eb_event_id].append(order)
+
+    local_events = {
+        event.eb_event_id: event
+        for event in Event.objects.filter(eb_event_id__in=list(orders_by_event))
+    }
+    batch = []
+    for eb_event_id, event_orders in orders_by_event.items():
+        event_local = local_events.get(eb_event_id)
+        if event_local is None:
+            # The organizer webhook covers all their events; orders of the
+            # ones not managed here are done without fetching the event
+            continue
+        try:
+            parsed_event = get_parsed_event(event_orders[0]['token'], eb_event_id)
+        except Exception as error:
+            for order in event_orders:
+                fail(order, error)
+            continue
+        for order in event_orders:
+            batch.append((order, parsed_event, event_local))
+    if not batch:
+        return
+
+    try:
+        with transaction.atomic():
+            lock_events({event_local.id for order, parsed_event, event_local in batch})
+            # Orders stored meanwhile by another worker are left out
+            batch = [
+                (order, parsed_event, event_local)
+                for order, parsed_event, event_local in batch
+                if record_webhook(order['url_base'])
+            ]
+            # Attendees already imported by a reconciliation get no new code
+            orders_by_event = defaultdict(list)
+            for order, parsed_event, event_local in batch:
+                orders_by_event[event_local].append(order)
+            for event_local, event_orders in orders_by_event.items():
+                existing = existing_attendee_keys(event_local, [
+                    attendee for order in event_orders for attendee in order['attendees']
+                ])
+                for order in event_orders:
+                    order['attendees'] = without_codes(order['attendees'], existing)
+            entries = [
+                (attendee, event_local)
+                for order, parsed_event, event_local in batch
+                for attendee in order['attendees']
+            ]
+            attendee_codes = iter(bulk_create_attendee_codes(entries))
+            recipients = []
+            for order, parsed_event, event_local in batch:
+                for attendee in order['attendees']:
+                    recipients.append((attendee.email, {
+                        'code': next(attendee_codes).code,
+                        'event': parsed_event,
+                        'id': event_local.id,
+                        'host': order['delivery'].host,
+                        'name': attendee.name,
+                    }))
+            send_emails_to_attendees(recipients)
+    except Exception as error:
+        for order, parsed_event, event_local in batch:
+            fail(order, error)
+
+
+def import_event_attendees(event, host, token=None, chunk_size=ATTENDEES_IMPORT_CHUNK_SIZE,
+                           changed_since=None):
+    # Streams /events/{id}/attendees/ so only one chunk is held in memory;
+    # attendees that already have a code for the event are skipped, which
+    # makes the import safe to run again.
+    if token is None:
+        token = get_access_token_of_event(event)
+    parsed_event = get_event_snapshot(event)
+    data = {}
+    if changed_since is not None:
+        data['changed_since'] = changed_since.astimezone(
+            timezone.utc).strftime(EB_DATETIME_FORMAT)
+    api_attendees = iter_paginated_api(
+        token,
+        '/events/{}/attendees/'.format(event.eb_event_id),
+        'attendees',
+        data=data,
     )
-    attende_code = AttendeeCode.objects.create(
-        attendee=attende,
-        event=event
+    imported = 0
+    while True:
+        chunk = list(islice(api_attendees, chunk_size))
+        if not chunk:
+            return imported
+        imported += import_attendees_chunk(event, parsed_event, host, chunk)
+
+
+def reconcile_event_attendees(event, host, token=None):
+    # Catches up on lost order webhooks with one incremental sweep. The
+    # cursor is taken before the sweep so changes made during it are seen
+    # by the next one, and only moves once the sweep read every page.
+    started = timezone.now()
+    changed_since = event.attendees_synced or started - timedelta(
+        seconds=ATTENDEES_RECONCILE_LOOKBACK)
+    imported = import_event_attendees(
+        event,
+        host,
+        token=token,
+        changed_since=changed_since,
     )
-    return attende_code
+    event.attendees_synced = started
+    event.save(update_fields=['attendees_synced'])
+    return imported
+
+
+def import_attendees_chunk(event, parsed_event, host, api_attendees):
+    attendees = build_attendees(api_attendees)
+    with transaction.atomic():
+        lock_events([event.id])
+        attendees = without_codes(attendees, existing_attendee_keys(event, attendees))
+        if not attendees:
+            return 0
+        attendee_codes = bulk_create_attendee_codes(
+            [(attendee, event) for attendee in attendees]
+        )
+        send_emails_to_attendees([
+            (attendee.email, {
+                'code': attende_code.code,
+                'event': parsed_event,
+                'id': event.id,
+                'host': host,
+                'name': attendee.name,
+            })
+            for attendee, attende_code in zip(attendees, attendee_codes)
+        ])
+    return len(attendees)
+
+
+def fetch_order(order):
+    try:
+        return get_eventbrite_data(
+            order['token'],
+            order['url_base'],
+            expand=ORDER_EXPAND,
+        ), None
+    except Exception as error:
+        return None, error
+
+
+def refresh_snapshot_from_webhook(body):
+    user_id = body['config']['user_id']
+    response = {
+        'status': False,
+        'email': False,
+    }
+    if webhook_available_to_process(user_id):
+        access_token = get_access_token_form_user_id(user_id)
+        resource_id = body['api_url'].rstrip('/').split('/')[-1]
+        if body['config']['action'] == 'venue.updated':
+            events = Event.objects.filter(eb_venue_id=resource_id)
+        else:
+            events = Event.objects.filter(eb_event_id=resource_id)
+        for event in events:
+            refresh_event_snapshot(event, access_token)
+        response['status'] = True
+    return response
 
 
 def get_access_token_form_user_id(user_id):
-    social_user = get_social_user(user_id)
-    access_token = social_user.access_token
-    return access_token
+    return get_organizer_token(user_id)
 
 
 def get_parsed_event(access_token, evb_id):
@@ -92,10 +407,8 @@ def get_parsed_event(access_token, evb_id):
     return parsed_event
 
 
-def get_eventbrite_data(access_token, url_base):
-    complete_url = url_base + '?token=' + access_token
-    data = requests.get(complete_url)
-    return json.loads(data.content)
+def get_eventbrite_data(access_token, url_base, expand=()):
+    return get_client(access_token).get(url_base, expand=expand)
 
 
 def create_order_webhook_from_view(user):
@@ -114,56 +427,57 @@ def create_webhook(token):
         'endpoint_url': URL_ENDPOINT,
         'actions': WH_ACTIONS,
     }
-    response = Eventbrite(token).post('/webhooks/', data)
+    response = get_client(token).post('/webhooks/', data)
     return response.get('id', None)
 
 
-def social_user_exists(user_id):
-    social_user = UserSocialAuth.objects.filter(uid=user_id)
-    if len(social_user) == 0:
-        return False
-    return True
+def update_webhook(token, webhook_id):
+    # Webhooks created before an action was added to WH_ACTIONS keep their
+    # old subscription until they are updated
+    data = {
+        'endpoint_url': URL_ENDPOINT,
+        'actions': WH_ACTIONS,
+    }
+    response = get_client(token).post('/webhooks/{}/'.format(webhook_id), data)
+    return response.get('id', None)
 
 
-def get_social_user(user_id):
-    social_user = UserSocialAuth.objects.filter(uid=user_id).first()
-    return social_user
+def webhook_available_to_process(user_id):
+    return get_organizer_token(user_id) is not None
 
 
-def webhook_available_to_process(user_id):
-    if UserSocialAuth.objects.exists() and social_user_exists(user_id):
-        return True
-    return False
+def send_emails_to_attendees(recipients):
+    # Queued with one INSERT; the send_emails worker delivers them
+    messages = [attendee_email(email, context) for email, context in recipients]
+    return queue_messages(messages)
 
 
-def send_email_to_attende(email, context):
-    to = email
+def attendee_email(email, context):
     subject = 'Documentation Required'
-    from_email = EMAIL_HOST_USER
     template_name = 'email/email_attende.html'
-    html_message = render_to_string(
+    html_message, text_content = render_email(
         template_name,
         context,
     )
-    text_content = strip_tags(html_message)
-    mail_sended = mail.send_mail(
+    message = mail.EmailMultiAlternatives(
         subject,
         text_content,
-        from_email,
-        [to],
-        html_message=html_message
+        EMAIL_HOST_USER,
+        [email],
     )
-    return mail_sended
+    message.attach_alternative(html_message, 'text/html')
+    return message
 
 
 def notify_attendee_from_attende_code(code):
     attendee_code = AttendeeCode.objects.get(code=code)
     attendee = Attendee.objects.get(id=attendee_code.attendee.id)
     docs = get_docs_from_event(event=attendee_code.event)
-    result = send_success_submission_email(attendee, docs)
-    if result:
-        attendee_code.available = False
-        attendee_code.save()
+    with transaction.atomic():
+        result = send_success_submission_email(attendee, docs)
+        if result:
+            attendee_code.available = False
+            attendee_code.save()
 
 
 def get_docs_from_event(event):
@@ -180,41 +494,220 @@ def send_success_submission_email(attendee, docs):
     context = {
         'docs': docs
     }
-    html_message = render_to_string(
+    html_message, text_content = render_email(
         template_name,
         context,
     )
-    text_content = strip_tags(html_message)
-    mail_sended = mail.send_mail(
+    message = mail.EmailMultiAlternatives(
         subject,
         text_content,
         from_email,
         [to],
-        html_message=html_message
     )
-    return mail_sended
+    message.attach_alternative(html_message, 'text/html')
+    return queue_message(message)
 
 
 def send_evaluator_decision_to_organizer(event_id, new_review):
-    to = Event.objects.get(id=event_id).organizer.email
+    event = Event.objects.select_related('organizer').get(id=event_id)
+    if event.review_notifications != 'immediate':
+        # Left for the next digest, see send_review_digests
+        return 0
+    to = event.organizer.email
     context = {
         'review': new_review,
     }
     subject = 'An evaluator made a review'
     from_email = EMAIL_HOST_USER
     template_name = 'email/evaluator_review.html'
-    html_message = render_to_string(
+    html_message, text_content = render_email(
         template_name,
         context,
     )
-    text_content = strip_tags(html_message)
-    return mail.send_mail(
+    message = mail.EmailMultiAlternatives(
         subject,
         text_content,
         from_email,
         [to],
-        html_message=html_message
     )
+    message.attach_alternative(html_message, 'text/html')
+    queued = queue_message(message)
+    Review.objects.filter(id=new_review.id).update(organizer_notified=True)
+    return queued
+
+
+def send_review_digests(host=URL_LOCAL, now=None):
+    # Collapses the reviews made since the last digest into one email per
+    # organizer. Events are locked so two runs never send the same digest.
+    # Returns how many digests were queued.
+    if now is None:
+        now = timezone.now()
+    due = Q()
+    for policy, period in REVIEW_DIGEST_PERIODS.items():
+        due |= Q(review_notifications=policy) & (
+            Q(review_digest_sent__isnull=True) | Q(review_digest_sent__lte=now - period)
+        )
+    with transaction.atomic():
+        event_ids = list(Event.objects.select_for_update(skip_locked=True).filter(
+            due).values_list('id', flat=True))
+        if not event_ids:
+            return 0
+        reviews = Review.objects.filter(
+            organizer_notified=False,
+            submission__event_id__in=event_ids,
+        ).select_related(
+            'evaluator',
+            'submission__event__organizer',
+        ).order_by('submission__event__organizer_id', 'submission__event_id', 'id')
+        messages = []
+        notified = []
+        sent_events = []
+        for organizer, organizer_reviews in groupby(
+                reviews, key=attrgetter('submission.event.organizer')):
+            events = []
+            for event, event_reviews in groupby(
+                    organizer_reviews, key=attrgetter('submission.event')):
+                event_reviews = list(event_reviews)
+                events.append((event, event_reviews))
+                notified.extend(review.id for review in event_reviews)
+                sent_events.append(event.id)
+            html_message, text_content = render_email('email/review_digest.html', {
+                'events': events,
+                'host': host,
+            })
+            message = mail.EmailMultiAlternatives(
+                'Reviews made in your events',
+                text_content,
+                EMAIL_HOST_USER,
+                [organizer.email],
+            )
+            message.attach_alternative(html_message, 'text/html')
+            messages.append(message)
+        queue_messages(messages)
+        Review.objects.filter(id__in=notified).update(organizer_notified=True)
+        Event.objects.filter(id__in=sent_events).update(review_digest_sent=now)
+    return len(messages)
+
+
+def evaluator_invitation_email(email, event, accept_url, decline_url):
+    html_content, text_content = render_email('email/evaluation_request.html', {
+        'event': event,
+        'accept_url': accept_url,
+        'decline_url': decline_url,
+    })
+    message = mail.EmailMultiAlternatives(
+        'Invitation to evaluate submissions for an event.',
+        text_content,
+        'kaizendev18@gmail.com',
+        [email],
+    )
+    message.attach_alternative(html_content, 'text/html')
+    return message
+
+
+def invite_evaluators(event, view_event, evaluators, absolute_url):
+    # evaluators are (name, email) pairs. Evaluators and invitations are
+    # stored with one INSERT each and the emails are queued in the same
+    # transaction, so the send_emails worker delivers them over one SMTP
+    # session. Returns {email: 'invited' or 'already invited'}.
+    evaluators = OrderedDict((email, name) for name, email in evaluators)
+    with transaction.atomic():
+        existing = {
+            evaluator.email: evaluator
+            for evaluator in Evaluator.objects.filter(email__in=list(evaluators))
+        }
+        created = Evaluator.objects.bulk_create([
+            Evaluator(name=name, email=email)
+            for email, name in evaluators.items()
+            if email not in existing
+        ])
+        existing.update((evaluator.email, evaluator) for evaluator in created)
+        invited = set(EvaluatorEvent.objects.filter(
+            event=event,
+            evaluator__email__in=list(evaluators),
+        ).values_list('evaluator__email', flat=True))
+        invitations = EvaluatorEvent.objects.bulk_create([
+            EvaluatorEvent(event=event, evaluator=existing[email])
+            for email in evaluators
+            if email not in invited
+        ])
+        queue_messages([
+            evaluator_invitation_email(
+                invitation.evaluator.email,
+                view_event,
+                absolute_url(reverse(
+                    'accept-invitation',
+                    kwargs={'invitation_code': invitation.invitation_code})),
+                absolute_url(reverse(
+                    'decline-invitation',
+                    kwargs={'invitation_code': invitation.invitation_code})),
+            )
+            for invitation in invitations
+        ])
+    return OrderedDict(
+        (email, 'already invited' if email in invited else 'invited')
+        for email in evaluators
+    )
+
+
+def publish_results(publication, batch_size=RESULTS_PUBLISH_BATCH_SIZE):
+    # Streams the unpublished results of the event from one query and
+    # queues their emails batch by batch. Each batch claims its rows with
+    # SKIP LOCKED and marks them published in the transaction that queues
+    # the emails, so a retried or concurrent job never emails a result
+    # twice and resumes where the last one stopped.
+    event = publication.event
+    parsed_event = get_event_snapshot(event)
+    ResultPublication.objects.filter(id=publication.id).update(state='running')
+    results = Result.objects.filter(
+        submission__event=event,
+        approved__isnull=False,
+        published_at__isnull=True,
+    ).select_related('submission__attendee').order_by('id').iterator()
+    published = 0
+    while True:
+        batch = list(islice(results, batch_size))
+        if not batch:
+            break
+        with transaction.atomic():
+            claimed = set(Result.objects.select_for_update(skip_locked=True).filter(
+                id__in=[result.id for result in batch],
+                published_at__isnull=True,
+            ).values_list('id', flat=True))
+            batch = [result for result in batch if result.id in claimed]
+            queue_messages([
+                result_email(result, parsed_event) for result in batch
+            ])
+            Result.objects.filter(id__in=claimed).update(
+                published_at=timezone.now(),
+            )
+            ResultPublication.objects.filter(id=publication.id).update(
+                published=F('published') + len(batch),
+            )
+        published += len(batch)
+    ResultPublication.objects.filter(id=publication.id).update(
+        state='done',
+        finished_at=timezone.now(),
+    )
+    return published
+
+
+def result_email(result, event):
+    attendee = result.submission.attendee
+    html_message, text_content = render_email('email/result_notification.html', {
+        'name': attendee.name,
+        'event': event,
+        'approved': result.approved,
+        'justification': result.justification,
+    })
+    message = mail.EmailMultiAlternatives(
+        'The results of {} are out'.format(event['name'] or 'your event'),
+        text_content,
+        EMAIL_HOST_USER,
+        [attendee.email],
+    )
+    message.attach_alternative(html_message, 'text/html')
+    return message
 
 
 def validate_files_submissions(files, id_event, attendee_id):
@@ -257,49 +750,164 @@ def validate_text_submissions(text_fields, id_event, attende_id):
 
 
 def evaluator_events(request):
-    evaluator = Evaluator.objects.filter(email=request.user.email)
-    event_list = []
-    accepted_events = []
-    if evaluator:
-        accepted_eval_event = EvaluatorEvent.objects.filter(
-            evaluator_id=evaluator[0].id, status='accepted')
-        for event in accepted_eval_event:
-            event_list.append(Event.objects.filter(id=event.event_id))
-        for event in event_list:
-            token = get_access_token_of_event(event[0])
-            eb_event = get_one_event_api(
-                token,
-                event[0].eb_event_id
-            )
-            accepted_events.append(parse_events(eb_event)[0])
-        if accepted_events:
-            for ev in accepted_events:
-                eb_event_id = ev['eb_id']
-                event = Event.objects.get(eb_event_id=eb_event_id)
-                ev['event_id'] = event.id
-    return accepted_events
+    events = list(Event.objects.filter(
+        evaluatorevent__evaluator__email=request.user.email,
+        evaluatorevent__status='accepted',
+    ).distinct().order_by('id'))
+    refresh_event_snapshots(
+        [event for event in events if not event.has_snapshot]
+    )
+    # Events Eventbrite could not return are listed from what is stored
+    # locally and flagged stale instead of disappearing from the list.
+    return [
+        event.snapshot.replace(
+            event_id=event.id,
+            stale=not event.has_snapshot,
+        )
+        for event in events
+    ]
+
+
+def organizer_events(user):
+    # Every managed event from the local rows, however old it is. Only the
+    # ones without a snapshot yet are fetched from Eventbrite.
+    events = list(Event.objects.filter(organizer=user).order_by(
+        F('start').desc(nulls_last=True), 'id'))
+    refresh_event_snapshots(
+        [event for event in events if not event.has_snapshot]
+    )
+    return [
+        event.snapshot.replace(stale=not event.has_snapshot)
+        for event in events
+    ]
+
+
+def get_event_snapshot(event):
+    if not event.has_snapshot:
+        try:
+            refresh_event_snapshot(event)
+        except EVENTBRITE_UNAVAILABLE:
+            pass
+    stale = is_snapshot_stale(event)
+    if stale and not breaker.is_open:
+        revalidate_in_background(event)
+    return event.snapshot.replace(stale=stale)
+
+
+def is_snapshot_stale(event):
+    if not event.has_snapshot:
+        return True
+    max_age = timedelta(seconds=EVENT_SNAPSHOT_MAX_AGE)
+    return timezone.now() - event.snapshot_updated > max_age
+
+
+def revalidate_in_background(event):
+    with _revalidating_lock:
+        if event.id in _revalidating:
+            return
+        _revalidating.add(event.id)
+    Thread(target=revalidate_event_snapshot, args=(event,), daemon=True).start()
+
+
+def revalidate_event_snapshot(event):
+    try:
+        refresh_event_snapshot(event)
+    except EVENTBRITE_UNAVAILABLE:
+        pass
+    finally:
+        with _revalidating_lock:
+            _revalidating.discard(event.id)
+        connection.close()
+
+
+def refresh_event_snapshot(event, token=None):
+    # Concurrent refreshes of one event share the token lookup, the API call
+    # and the UPDATE; the callers that waited only copy the result.
+    parsed_event = _snapshot_flight.do(
+        event.eb_event_id,
+        lambda: store_event_snapshot(event, token),
+    )
+    event.apply_snapshot(parsed_event)
+    return event.snapshot
+
+
+def store_event_snapshot(event, token=None):
+    if token is None:
+        token = get_access_token_of_event(event)
+    invalidate_event(event.eb_event_id)
+    eb_event = get_one_event_api(token, event.eb_event_id)
+    parsed_event = parse_events(eb_event)[0]
+    event.update_snapshot(parsed_event)
+    return parsed_event
+
+
+def get_organizer_tokens(events):
+    return {
+        user_id: extra_data['access_token']
+        for user_id, extra_data in UserSocialAuth.objects.filter(
+            user_id__in={event.organizer_id for event in events},
+            provider='eventbrite',
+        ).values_list('user_id', 'extra_data')
+    }
+
+
+def refresh_event_snapshots(events):
+    organizer_tokens = get_organizer_tokens(events)
+    events = [
+        event for event in events if event.organizer_id in organizer_tokens
+    ]
+    for event in events:
+        invalidate_event(event.eb_event_id)
+    api_events = get_events_api_concurrently([
+        (organizer_tokens[event.organizer_id], event.eb_event_id)
+        for event in events
+    ])
+    refreshed = 0
+    for event, api_event in zip(events, api_events):
+        if api_event is not None and is_cacheable(api_event):
+            event.update_snapshot(parse_events([api_event])[0])
+            refreshed += 1
+    return refreshed
+
+
+def get_events_api_concurrently(requests_args):
+    # One unreachable event must not cost the others their result, so
+    # failures come back as None in its place.
+    return map_concurrently(get_event_or_none, requests_args)
+
+
+def get_event_or_none(args):
+    try:
+        return get_one_event_api(*args)[0]
+    except EVENTBRITE_UNAVAILABLE:
+        return None
+
+
+def map_concurrently(function, items):
+    if len(items) <= 1:
+        return [function(item) for item in items]
+    workers = min(EVENTBRITE_MAX_WORKERS, len(items))
+    background = is_background()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(
+            lambda item: call_in_thread(function, item, background=background),
+            items,
+        ))
+
+
+def call_in_thread(function, item, background=False):
+    try:
+        if background:
+            with background_requests():
+                return function(item)
+        return function(item)
+    finally:
+        # Worker threads open their own connection for the shared cache.
+        connection.close()
 
 
 def parse_events(api_events):
-    events = []
-    for event in api_events:
-        view_event = {
-            'eb_id': event.get('id', None),
-            'name': event.get('name', {}).get('text', 'Unnamed'),
-            'start': datetime.strptime(event['start']['utc'], '%Y-%m-%dT%H:%M:%SZ'),
-            'end': datetime.strptime(event['end']['utc'], '%Y-%m-%dT%H:%M:%SZ'),
-            'description': event.get('description', {}).get('text', 'No description'),
-            'logo': (event.get('logo', {}) or {}).get('original', {}).get('url', None),
-            'is_free': event.get('is_free', {}),
-            'venue_id': event.get('venue_id', {}),
-        }
-        if view_event['venue_id']:
-            view_event['venue'] = event.get('venue', {}).get(
-                'address', {}).get('localized_address_display', None)
-        else:
-            view_event['venue'] = ''
-        events.append(view_event)
-    return events
+    return [ParsedEvent.from_api(event) for event in api_events]
 
 
 def get_auth_token(user):
@@ -313,47 +921,90 @@ def get_auth_token(user):
     return token
 
 
-def get_all_events_api(token):
-    eventbrite = Eventbrite(token)
-    return eventbrite.get('/users/me/events/').get('events', [])
+def iter_paginated_api(token, path, key, data=None, expand=()):
+    eventbrite = get_client(token)
+    data = dict(data or {})
+    while True:
+        response = eventbrite.get(path, data=dict(data), expand=expand)
+        if key not in response:
+            # An error payload is not the end of the list
+            raise EventbriteResponseError(response)
+        for item in response[key]:
+            yield item
+        pagination = response.get('pagination') or {}
+        if not pagination.get('has_more_items'):
+            return
+        data['continuation'] = pagination['continuation']
+
 
+def iter_events_api(token, expand=(), status=None, time_filter=None, order_by=None):
+    filters = {
+        'status': status,
+        'time_filter': time_filter,
+        'order_by': order_by,
+    }
+    return iter_paginated_api(
+        token,
+        '/users/me/events/',
+        'events',
+        data={name: value for name, value in filters.items() if value},
+        expand=expand,
+    )
 
-def get_events_with_venues_api(token):
-    eventbrite = Eventbrite(token)
-    return eventbrite.get(
-        path='/users/me/events/',
-        expand=('venue',)).get('events', [])
+
+def get_all_events_api(token, **filters):
+    return iter_events_api(token, **filters)
+
+
+def get_events_with_venues_api(token, **filters):
+    return iter_events_api(token, expand=('venue',), **filters)
 
 
 def get_one_event_api(token, eb_event_id):
-    eventbrite = Eventbrite(token)
-    one_event = [eventbrite.get('/events/{}/'.format(eb_event_id))]
+    one_event = [get_cached_event(
+        eb_event_id,
+        lambda: get_client(token).get(
+            '/events/{}/'.format(eb_event_id),
+            expand=('venue',),
+        ),
+    )]
     return one_event
 
 
+def get_managed_events(api_events):
+    # Only look up the ids the API returned, keyed for O(1) membership
+    return dict(
+        Event.objects.filter(
+            eb_event_id__in=[api_event['eb_id'] for api_event in api_events],
+        ).values_list('eb_event_id', 'id')
+    )
+
+
 def filter_managed_event(api_events, model_events):
+    managed_events = dict(model_events)
     events = []
     for api_event in api_events:
-        for docs_event in model_events:
-            if api_event['eb_id'] in docs_event[0]:
-                api_event['id'] = docs_event[1]
-                events.append(api_event)
+        if api_event['eb_id'] in managed_events:
+            events.append(
+                api_event.replace(id=managed_events[api_event['eb_id']]))
     return events
 
 
 def filter_no_managed_event(api_events, model_events):
-    events = []
-    for eb_event in api_events:
-        if eb_event['eb_id'] not in model_events:
-            events.append(eb_event)
-    return events
+    managed_events = set(model_events)
+    return [
+        eb_event for eb_event in api_events
+        if eb_event['eb_id'] not in managed_events
+    ]
 
 
 def select_event(request, eb_event_id):
+    invalidate_event(eb_event_id)
     eb_event = get_one_event_api(get_auth_token(request.user), eb_event_id)
     view_event = parse_events(eb_event)
     default_end_submission = view_event[0]['start']
     new_event = add_event(eb_event_id, default_end_submission, request.user)
+    new_event.update_snapshot(view_event[0])
     return HttpResponseRedirect(
         reverse(
             'docs', kwargs={
@@ -361,8 +1012,10 @@ def select_event(request, eb_event_id):
 
 
 def add_event(eb_event_id, end_submission, organizer):
+    # Attendees from before the adoption are only imported on request
     new_event = Event(eb_event_id=eb_event_id,
-                      end_submission=end_submission, organizer=organizer)
+                      end_submission=end_submission, organizer=organizer,
+                      attendees_synced=timezone.now())
     new_event.save()
     return new_event
 
@@ -381,6 +1034,11 @@ def get_access_token_of_event(event):
 
 
 @csrf_exempt
+@admission_control
 def accept_webhook(request):
-    get_data(json.loads(request.body), request.META['URL_LOCAL'])
+    # The order fetch, inserts and emails run in the process_webhooks worker
+    try:
+        enqueue_webhook(request.body, request.META.get('URL_LOCAL', URL_LOCAL))
+    except ValueError:
+        return HttpResponseBadRequest()
     return HttpResponse()
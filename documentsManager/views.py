@@ -1,17 +1,15 @@
 # -*- coding: utf-8 -*-
-
+from itertools import islice
 
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core.exceptions import MultipleObjectsReturned
 from django.core.mail import EmailMultiAlternatives
+from django.db import transaction
 from django.http import HttpResponse, HttpResponseRedirect
-from django.shortcuts import redirect
-from django.template.base import logger
-from django.template.loader import render_to_string
+from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse
 from django.utils.decorators import method_decorator
-from django.utils.html import strip_tags
 from django.views import View
 from django.views.generic import (
     CreateView,
@@ -28,25 +26,37 @@ from multi_form_view import MultiFormView
 
 from documentsManager.utils import (
     evaluator_events,
-    get_access_token_of_event,
     get_all_events_api,
     get_auth_token,
-    get_events_with_venues_api,
-    get_one_event_api,
+    get_event_snapshot,
+    get_managed_events,
+    invite_evaluators,
     filter_no_managed_event,
-    filter_managed_event,
+    organizer_events,
     parse_events,
     send_evaluator_decision_to_organizer,
     update_dates,
 )
+from .app_settings import (
+    EVENTS_LIST_LIMIT,
+    EVENTS_LIST_ORDER,
+    URL_LOCAL,
+)
+from .email_templates import render_email
+from .eventbrite_client import (
+    EVENTBRITE_UNAVAILABLE,
+    EventbriteResponseError,
+)
 from .filters import SubmissionFilter
 from .forms import (
     EvaluationDateForm,
+    EvaluatorBulkForm,
     EvaluatorForm,
     EventForm,
     FileDocForm,
     ResultForm,
     ReviewForm,
+    ReviewNotificationsForm,
     SignUpForm,
     SubmissionForm,
     TextDocForm,
@@ -62,7 +72,9 @@ from .models import (
     Submission,
     TextDoc,
     Result,
+    ResultPublication,
 )
+from .outbox import queue_message
 from .tables import (
     SubmissionsTable,
     SubmissionsTableEvaluator,
@@ -71,6 +83,10 @@ from .tables import (
 from .utils import (
     create_order_webhook_from_view,
 )
+from .webhook_queue import (
+    enqueue_attendees_import,
+    enqueue_results_publication,
+)
 
 
 @method_decorator(login_required, name='dispatch')
@@ -80,10 +96,20 @@ class EventsView(TemplateView, LoginRequiredMixin):
     def get_context_data(self, **kwargs):
         context = super(EventsView, self).get_context_data(**kwargs)
         context['user'] = self.request.user
-        api_events = get_all_events_api(get_auth_token(self.request.user))
-        eb_events = parse_events(api_events)
-        events_id_list = Event.objects.all().values_list('eb_event_id', flat=True)
-        view_events = filter_no_managed_event(eb_events, events_id_list)
+        api_events = get_all_events_api(
+            get_auth_token(self.request.user),
+            order_by=EVENTS_LIST_ORDER,
+        )
+        try:
+            eb_events = parse_events(islice(api_events, EVENTS_LIST_LIMIT + 1))
+        except EVENTBRITE_UNAVAILABLE + (EventbriteResponseError,):
+            eb_events = []
+            context['eventbrite_unavailable'] = True
+        if len(eb_events) > EVENTS_LIST_LIMIT:
+            eb_events = eb_events[:EVENTS_LIST_LIMIT]
+            context['events_limit'] = EVENTS_LIST_LIMIT
+        view_events = filter_no_managed_event(
+            eb_events, get_managed_events(eb_events))
         context['events'] = view_events
         return context
 
@@ -106,12 +132,7 @@ class DocFormView(MultiFormView, LoginRequiredMixin):
         event_id = self.kwargs['event_id']
         event = Event.objects.get(id=event_id)
         context['pr_event_id'] = event.id
-        eb_event = get_one_event_api(get_auth_token(
-            self.request.user), event.eb_event_id)
-        view_event = parse_events(eb_event)
-        event = view_event[0]
-        event['id'] = event_id
-        context['event'] = event
+        context['event'] = get_event_snapshot(event)
         context['file_form'] = self.file_form
         return context
 
@@ -160,12 +181,7 @@ class DocsView(FormView, LoginRequiredMixin):
             'init_submission': event.init_submission,
             'end_submission': event.end_submission,
         })
-        eb_event = get_one_event_api(get_auth_token(
-            self.request.user), event.eb_event_id)
-        view_event = parse_events(eb_event)
-        view_event[0]['eb_event_start'] = eb_event[0]['start']['utc']
-        view_event[0]['id'] = event_id
-        context['event'] = view_event[0]
+        context['event'] = get_event_snapshot(event)
         context['event_id'] = event_id
         user_id = self.request.user.id
         is_organizer = user_id == event.organizer.id
@@ -196,6 +212,42 @@ class DocsView(FormView, LoginRequiredMixin):
                     'event_id': self.kwargs['event_id']}))
 
 
+@method_decorator(login_required, name='dispatch')
+class ImportAttendeesView(View, LoginRequiredMixin):
+
+    def post(self, request, *args, **kwargs):
+        with transaction.atomic():
+            # The event row lock serializes double submits
+            event = get_object_or_404(
+                Event.objects.select_for_update(),
+                id=self.kwargs['event_id'],
+                organizer=request.user,
+            )
+            enqueue_attendees_import(event, URL_LOCAL)
+        return HttpResponseRedirect(
+            reverse(
+                'docs', kwargs={
+                    'event_id': event.id}))
+
+
+@method_decorator(login_required, name='dispatch')
+class ReviewNotificationsView(View):
+
+    def post(self, request, *args, **kwargs):
+        event = get_object_or_404(
+            Event,
+            id=self.kwargs['event_id'],
+            organizer=request.user,
+        )
+        form = ReviewNotificationsForm(request.POST, instance=event)
+        if form.is_valid():
+            form.save()
+        return HttpResponseRedirect(
+            reverse(
+                'evaluators', kwargs={
+                    'event_id': event.id}))
+
+
 @method_decorator(login_required, name='dispatch')
 class HomeView(TemplateView, LoginRequiredMixin):
     template_name = 'home.html'
@@ -222,12 +274,7 @@ class HomeView(TemplateView, LoginRequiredMixin):
         context['events_to_evaluate'] = self.accepted_events
         if context['is_eb_user']:
             create_order_webhook_from_view(self.request.user)
-            api_events_w_venues = get_events_with_venues_api(
-                get_auth_token(self.request.user))
-            parse_api_events = parse_events(api_events_w_venues)
-            docs_events_list = Event.objects.all().values_list('eb_event_id', 'id')
-            events = filter_managed_event(parse_api_events, docs_events_list)
-            context['events'] = events
+            context['events'] = organizer_events(self.request.user)
         return context
 
 
@@ -318,11 +365,7 @@ class LandingView(FormView):
             context['attendee'] = AttendeeCode.objects.get(code=self.kwargs['code']).attendee
         if event:
             context['event'] = event
-            eb_event = get_one_event_api(
-                get_access_token_of_event(event),
-                event.eb_event_id
-            )
-            context['eb_event'] = parse_events(eb_event)[0]
+            context['eb_event'] = get_event_snapshot(event)
             text_docs = TextDoc.objects.filter(event=event)
             if text_docs:
                 context['text_docs'] = text_docs
@@ -351,16 +394,11 @@ class EvaluatorList(FormView, LoginRequiredMixin):
         context = super(EvaluatorList, self).get_context_data(**kwargs)
         event_id = self.kwargs['event_id']
         event = Event.objects.get(id=event_id)
-        eb_event = get_one_event_api(
-            get_auth_token(self.request.user),
-            event.eb_event_id
-        )
         user_id = self.request.user.id
         if user_id == event.organizer.id:
             context['is_organizer'] = True
-        view_event = parse_events(eb_event)
         context['event_id'] = event_id
-        context['event'] = view_event[0]
+        context['event'] = get_event_snapshot(event)
         context['event_model'] = event
         context['evaluator_events'] = EvaluatorEvent.objects.filter(
             event=event).select_related('evaluator')
@@ -368,6 +406,7 @@ class EvaluatorList(FormView, LoginRequiredMixin):
             'start_evaluation': event.start_evaluation,
             'end_evaluation': event.end_evaluation,
         })
+        context['notifications_form'] = ReviewNotificationsForm(instance=event)
         return context
 
     def post(self, request, *args, **kwargs):
@@ -404,23 +443,21 @@ class EvaluatorCreate(CreateView):
     def form_valid(self, form):
         event_id = self.kwargs['event_id']
         event = Event.objects.get(pk=event_id)
-        try:
-            evaluator = Evaluator.objects.get(email=form.cleaned_data['email'])
-            EvaluatorEvent.objects.create(
-                evaluator=evaluator, event=event)
-        except Evaluator.DoesNotExist:
-            evaluator = form.save(update=False, event_id=event_id)
-        evaluator_event = EvaluatorEvent.objects.get(
-            event=event, evaluator=evaluator)
-        eb_event = get_one_event_api(get_auth_token(
-            self.request.user), event.eb_event_id)
-        parsed_event = parse_events(eb_event)
-        accept_url = self.request.build_absolute_uri(
-            reverse('accept-invitation', kwargs={'invitation_code': evaluator_event.invitation_code}))
-        decline_url = self.request.build_absolute_uri(
-            reverse('decline-invitation', kwargs={'invitation_code': evaluator_event.invitation_code}))
-        parsed_event[0]['id'] = event_id
-        form.send_email(form, parsed_event[0], accept_url, decline_url)
+        view_event = get_event_snapshot(event)
+        with transaction.atomic():
+            try:
+                evaluator = Evaluator.objects.get(email=form.cleaned_data['email'])
+                EvaluatorEvent.objects.create(
+                    evaluator=evaluator, event=event)
+            except Evaluator.DoesNotExist:
+                evaluator = form.save(update=False, event_id=event_id)
+            evaluator_event = EvaluatorEvent.objects.get(
+                event=event, evaluator=evaluator)
+            accept_url = self.request.build_absolute_uri(
+                reverse('accept-invitation', kwargs={'invitation_code': evaluator_event.invitation_code}))
+            decline_url = self.request.build_absolute_uri(
+                reverse('decline-invitation', kwargs={'invitation_code': evaluator_event.invitation_code}))
+            form.send_email(form, view_event, accept_url, decline_url)
         return HttpResponseRedirect(self.get_success_url())
 
     def get_success_url(self):
@@ -432,6 +469,38 @@ class EvaluatorCreate(CreateView):
         )
 
 
+@method_decorator(login_required, name='dispatch')
+class EvaluatorBulkCreate(FormView):
+    template_name = 'evaluator_bulk_form.html'
+    form_class = EvaluatorBulkForm
+
+    def get_event(self):
+        return get_object_or_404(
+            Event,
+            id=self.kwargs['event_id'],
+            organizer=self.request.user,
+        )
+
+    def get_context_data(self, **kwargs):
+        context = super(EvaluatorBulkCreate, self).get_context_data(**kwargs)
+        context['event_id'] = self.get_event().id
+        return context
+
+    def form_valid(self, form):
+        event = self.get_event()
+        outcomes = invite_evaluators(
+            event,
+            get_event_snapshot(event),
+            form.evaluators,
+            self.request.build_absolute_uri,
+        )
+        return self.render_to_response(self.get_context_data(
+            form=self.form_class(),
+            outcomes=outcomes,
+            invalid_rows=form.invalid_rows,
+        ))
+
+
 @method_decorator(login_required, name='dispatch')
 class EvaluatorUpdate(UpdateView):
     model = Evaluator
@@ -501,13 +570,9 @@ class SubmissionsList(SingleTableMixin, FilterView):
         is_organizer = user_id == event.organizer.id
         if is_organizer:
             context['is_organizer'] = True
-        if self.request.user.social_auth.exists():
-            token = get_auth_token(self.request.user)
-        else:
-            token = get_access_token_of_event(event)
+        if not self.request.user.social_auth.exists():
             evaluator = Evaluator.objects.get(email=self.request.user.email)
-        eb_event = get_one_event_api(token, event.eb_event_id)
-        context['event'] = parse_events(eb_event)[0]
+        context['event'] = get_event_snapshot(event)
         context['evaluators_cont'] = EvaluatorEvent.objects.filter(
             event=event,
             status='accepted',
@@ -555,9 +620,7 @@ class SubmissionView(DetailView, LoginRequiredMixin):
         event_id = self.kwargs['event_id']
         context['event_id'] = event_id
         event = Event.objects.get(id=event_id)
-        token = get_access_token_of_event(event)
-        eb_event = get_one_event_api(token, event.eb_event_id)
-        context['event'] = parse_events(eb_event)[0]
+        context['event'] = get_event_snapshot(event)
         context['reviews'] = Review.objects.filter(
             submission_id=self.object.id
         )
@@ -587,9 +650,7 @@ class ReviewView(FormView, LoginRequiredMixin):
         event_id = self.kwargs['event_id']
         context['event_id'] = event_id
         event = Event.objects.get(id=event_id)
-        token = get_access_token_of_event(event)
-        eb_event = get_one_event_api(token, event.eb_event_id)
-        context['event'] = parse_events(eb_event)[0]
+        context['event'] = get_event_snapshot(event)
         return context
 
     def post(self, request, **kwargs):
@@ -617,10 +678,11 @@ class ReviewView(FormView, LoginRequiredMixin):
         new_review.evaluator = Evaluator.objects.get(
             email=self.request.user.email)
         new_review.approved = self.is_aprove
-        new_review.save()
-        new_review.submission.state = 'evaluated'
-        new_review.submission.save()
-        send_evaluator_decision_to_organizer(self.kwargs['event_id'], new_review)
+        with transaction.atomic():
+            new_review.save()
+            new_review.submission.state = 'evaluated'
+            new_review.submission.save()
+            send_evaluator_decision_to_organizer(self.kwargs['event_id'], new_review)
         return
 
 
@@ -640,14 +702,42 @@ class ResultsView(ListView):
         user_id = self.request.user.id
         if user_id == event.organizer.id:
             context['is_organizer'] = True
-        if self.request.user.social_auth.exists():
-            token = get_auth_token(self.request.user)
-        else:
-            token = get_access_token_of_event(event)
-        eb_event = get_one_event_api(token, event.eb_event_id)
-        context['event'] = parse_events(eb_event)[0]
+        context['event'] = get_event_snapshot(event)
+        context['publication'] = ResultPublication.objects.filter(
+            event=event).order_by('-id').first()
         return context
-    
+
+
+@method_decorator(login_required, name='dispatch')
+class PublishResultsView(View):
+
+    def post(self, request, *args, **kwargs):
+        with transaction.atomic():
+            # The event row lock serializes double submits
+            event = get_object_or_404(
+                Event.objects.select_for_update(),
+                id=self.kwargs['event_id'],
+                organizer=request.user,
+            )
+            in_progress = ResultPublication.objects.filter(
+                event=event,
+                state__in=('pending', 'running'),
+            ).exists()
+            if not in_progress:
+                publication = ResultPublication.objects.create(
+                    event=event,
+                    total=Result.objects.filter(
+                        submission__event=event,
+                        approved__isnull=False,
+                        published_at__isnull=True,
+                    ).count(),
+                )
+                enqueue_results_publication(publication)
+        return HttpResponseRedirect(
+            reverse(
+                'results', kwargs={
+                    'event_id': event.id}))
+
 
 @method_decorator(login_required, name='dispatch')
 class ResultCreate(CreateView, LoginRequiredMixin):
@@ -707,23 +797,20 @@ class AcceptInvitationView(TemplateView):
         invitation_code = self.kwargs['invitation_code']
         evaluator_event = EvaluatorEvent.objects.get(
             invitation_code=invitation_code)
-        evaluator_event.status = 'accepted'
-        evaluator_event.save()
         evaluator = Evaluator.objects.get(pk=evaluator_event.evaluator.id)
         event = Event.objects.get(pk=evaluator_event.event.id)
         FROM = 'kaizendev18@gmail.com'
         TO = event.organizer.email
         SUBJECT = 'A new Evaluator for your event has accepted.'
-        html_content = render_to_string('email/new_evaluator.html', {
+        html_content, text_content = render_email('email/new_evaluator.html', {
             'evaluator': evaluator})
-        text_content = strip_tags(html_content)
         msg = EmailMultiAlternatives(
             SUBJECT, text_content, FROM, [TO])
         msg.attach_alternative(html_content, "text/html")
-        try:
-            msg.send()
-        except Exception as e:
-            logger.exception(e)
+        with transaction.atomic():
+            evaluator_event.status = 'accepted'
+            evaluator_event.save()
+            queue_message(msg)
         return context
 
 
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+import time
+from collections import Counter
+from functools import wraps
+from threading import BoundedSemaphore, Lock
+
+from django.http import HttpResponse
+
+from .app_settings import (
+    WEBHOOK_BUSY_RETRY_AFTER,
+    WEBHOOK_FULL_RETRY_AFTER,
+    WEBHOOK_MAX_IN_FLIGHT,
+    WEBHOOK_METRICS_FLUSH,
+    WEBHOOK_QUEUE_DEPTH_TTL,
+    WEBHOOK_QUEUE_MAX_DEPTH,
+)
+from .event_cache import get_control_cache
+from .models import WebhookDelivery
+
+METRICS_KEY = 'webhooks:metrics:{}'
+METRICS = (
+    'accepted',
+    'shed_busy',
+    'shed_queue_full',
+)
+
+_in_flight = BoundedSemaphore(WEBHOOK_MAX_IN_FLIGHT)
+_queue_depth = 0
+_queue_depth_checked_at = None
+_queue_depth_lock = Lock()
+_counters = Counter()
+_counters_lock = Lock()
+_flushed_at = time.monotonic()
+
+
+def get_queue_depth():
+    # Counted at most every WEBHOOK_QUEUE_DEPTH_TTL seconds per process, so
+    # shedding a request under load does not touch the database.
+    global _queue_depth, _queue_depth_checked_at
+    now = time.monotonic()
+    with _queue_depth_lock:
+        if (_queue_depth_checked_at is not None and
+                now - _queue_depth_checked_at < WEBHOOK_QUEUE_DEPTH_TTL):
+            return _queue_depth
+        _queue_depth_checked_at = now
+    _queue_depth = WebhookDelivery.objects.filter(state='pending').count()
+    return _queue_depth
+
+
+def shed(status, retry_after, metric):
+    record(metric)
+    response = HttpResponse(status=status)
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+def admission_control(view):
+    # Eventbrite retries non-2xx deliveries, so saturation is answered with
+    # a cheap 503 (too many requests in flight here) or 429 (queue backlog).
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if get_queue_depth() >= WEBHOOK_QUEUE_MAX_DEPTH:
+            return shed(429, WEBHOOK_FULL_RETRY_AFTER, 'shed_queue_full')
+        if not _in_flight.acquire(blocking=False):
+            return shed(503, WEBHOOK_BUSY_RETRY_AFTER, 'shed_busy')
+        try:
+            response = view(request, *args, **kwargs)
+        finally:
+            _in_flight.release()
+        if response.status_code == 200:
+            record('accepted')
+        return response
+    return wrapper
+
+
+def record(metric):
+    global _flushed_at
+    with _counters_lock:
+        _counters[metric] += 1
+        if time.monotonic() - _flushed_at < WEBHOOK_METRICS_FLUSH:
+            return
+        counters = dict(_counters)
+        _counters.clear()
+        _flushed_at = time.monotonic()
+    flush_metrics(counters)
+
+
+def reset_queue_depth():
+    global _queue_depth, _queue_depth_checked_at
+    with _queue_depth_lock:
+        _queue_depth = 0
+        _queue_depth_checked_at = None
+
+
+def flush_metrics(counters=None):
+    # Per-process counts are added to totals in the control cache, so every
+    # worker reports to the same numbers.
+    if counters is None:
+        with _counters_lock:
+            counters = dict(_counters)
+            _counters.clear()
+    cache = get_control_cache()
+    for metric, count in counters.items():
+        key = METRICS_KEY.format(metric)
+        if not cache.add(key, count, None):
+            try:
+                cache.incr(key, count)
+            except ValueError:
+                cache.set(key, count, None)
+
+
+def get_metrics():
+    cache = get_control_cache()
+    metrics = {
+        metric: cache.get(METRICS_KEY.format(metric), 0)
+        for metric in METRICS
+    }
+    metrics['queue_depth'] = WebhookDelivery.objects.filter(state='pending').count()
+    return metrics
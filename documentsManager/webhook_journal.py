@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+import json
+
+from .app_settings import (
+    EVENTBRITE_API_URL,
+    EVENTBRITE_WH_ACTIONS,
+)
+from .models import WebhookDelivery
+
+EVENTBRITE_PRODUCTION_URL = 'https://www.eventbriteapi.com/v3/'
+
+
+def iter_journal(since=None, until=None):
+    # WebhookDelivery keeps every accepted payload with its arrival time,
+    # so it doubles as the journal; shed requests were never accepted.
+    # Internal jobs such as result publications are not Eventbrite traffic.
+    deliveries = WebhookDelivery.objects.filter(
+        internal=False,
+        action__in=EVENTBRITE_WH_ACTIONS,
+    ).order_by('created', 'id')
+    if since is not None:
+        deliveries = deliveries.filter(created__gte=since)
+    if until is not None:
+        deliveries = deliveries.filter(created__lt=until)
+    for created, host, payload in deliveries.values_list(
+            'created', 'host', 'payload').iterator():
+        yield {
+            't': created.timestamp(),
+            'host': host,
+            'payload': payload,
+        }
+
+
+def write_journal(records, output):
+    written = 0
+    for record in records:
+        output.write(json.dumps(record, separators=(',', ':')))
+        output.write('\n')
+        written += 1
+    return written
+
+
+def read_journal(journal):
+    for line in journal:
+        if line.strip():
+            yield json.loads(line)
+
+
+def to_stand_in(body, api_url=EVENTBRITE_API_URL):
+    # Payloads point at production Eventbrite; the SDK only accepts absolute
+    # URLs under its own base, so they are moved to the stand-in.
+    url = body.get('api_url') or ''
+    if url.startswith(EVENTBRITE_PRODUCTION_URL):
+        body['api_url'] = api_url + url[len(EVENTBRITE_PRODUCTION_URL):]
+    return body
+
+
+def percentile(values, percent):
+    if not values:
+        return 0
+    values = sorted(values)
+    index = int(round(percent / 100.0 * (len(values) - 1)))
+    return values[index]
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+import json
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.template.base import logger
+from django.utils import timezone
+
+from .app_settings import (
+    ATTENDEES_IMPORT_ACTION,
+    EVENTBRITE_WH_ACTIONS,
+    RESULTS_PUBLISH_ACTION,
+    WEBHOOK_LOCK_TIMEOUT,
+    WEBHOOK_MAX_ATTEMPTS,
+    WEBHOOK_RETRY_BASE,
+    WEBHOOK_RETRY_MAX,
+)
+from .models import (
+    ResultPublication,
+    WebhookDelivery,
+    WebhookLedger,
+)
+
+
+def enqueue_webhook(body, host):
+    # Only checks the payload is a JSON object with an action we subscribe
+    # to; everything else waits for the worker so Eventbrite gets its
+    # answer straight away.
+    if isinstance(body, bytes):
+        body = body.decode('utf-8')
+    data = json.loads(body)
+    if not isinstance(data, dict):
+        raise ValueError('Webhook payload must be a JSON object')
+    action = (data.get('config') or {}).get('action') or ''
+    if action not in EVENTBRITE_WH_ACTIONS:
+        raise ValueError('Unexpected webhook action: {!r}'.format(action))
+    return WebhookDelivery.objects.create(
+        payload=body,
+        host=host,
+        action=action,
+    )
+
+
+def enqueue_attendees_import(event, host):
+    # An import of the event that has not finished yet is reused, so a
+    # double submit queues one job
+    payload = json.dumps({
+        'config': {'action': ATTENDEES_IMPORT_ACTION},
+        'event_id': event.id,
+    })
+    queued = WebhookDelivery.objects.filter(
+        internal=True,
+        action=ATTENDEES_IMPORT_ACTION,
+        state__in=('pending', 'processing'),
+        payload=payload,
+    ).first()
+    if queued is not None:
+        return queued
+    return WebhookDelivery.objects.create(
+        payload=payload,
+        host=host,
+        action=ATTENDEES_IMPORT_ACTION,
+        internal=True,
+    )
+
+
+def enqueue_results_publication(publication):
+    return WebhookDelivery.objects.create(
+        payload=json.dumps({
+            'config': {'action': RESULTS_PUBLISH_ACTION},
+            'publication_id': publication.id,
+        }),
+        action=RESULTS_PUBLISH_ACTION,
+        internal=True,
+    )
+
+
+def ledger_key(api_url):
+    return api_url.rstrip('/')
+
+
+def webhook_seen(api_url):
+    # A redelivery costs one indexed lookup and never reaches Eventbrite or
+    # the mail server.
+    return WebhookLedger.objects.filter(api_url=ledger_key(api_url)).exists()
+
+
+def record_webhook(api_url):
+    # Must run inside the transaction that stores the order, so the ledger
+    # row commits together with the codes and a worker dying mid-order
+    # leaves nothing behind. The unique index settles concurrent first
+    # deliveries: False means another one already stored the order.
+    try:
+        with transaction.atomic():
+            WebhookLedger.objects.create(api_url=ledger_key(api_url))
+    except IntegrityError:
+        return False
+    return True
+
+
+def claim_deliveries(limit):
+    # Deliveries left in 'processing' by a worker that died are picked up
+    # again once their lock expires.
+    now = timezone.now()
+    expired = now - timedelta(seconds=WEBHOOK_LOCK_TIMEOUT)
+    with transaction.atomic():
+        ids = list(
+            WebhookDelivery.objects.select_for_update(skip_locked=True).filter(
+                Q(state='pending', available_at__lte=now) |
+                Q(state='processing', locked_at__lt=expired),
+            ).order_by('available_at', 'id').values_list('id', flat=True)[:limit]
+        )
+        WebhookDelivery.objects.filter(id__in=ids).update(
+            state='processing',
+            locked_at=now,
+            attempts=F('attempts') + 1,
+        )
+    return list(WebhookDelivery.objects.filter(id__in=ids).order_by('id'))
+
+
+def retry_delay(attempts, retry_after=None):
+    if retry_after is not None:
+        return min(retry_after, WEBHOOK_RETRY_MAX)
+    return min(WEBHOOK_RETRY_BASE * 2 ** max(attempts - 1, 0), WEBHOOK_RETRY_MAX)
+
+
+def complete_delivery(delivery):
+    complete_deliveries([delivery])
+
+
+def complete_deliveries(deliveries):
+    WebhookDelivery.objects.filter(id__in=[delivery.id for delivery in deliveries]).update(
+        state='done',
+        locked_at=None,
+        last_error='',
+        processed_at=timezone.now(),
+    )
+
+
+def fail_delivery(delivery, error):
+    now = timezone.now()
+    changes = {
+        'locked_at': None,
+        'last_error': '{}: {}'.format(type(error).__name__, error),
+    }
+    if delivery.attempts >= WEBHOOK_MAX_ATTEMPTS:
+        changes.update(state='dead', processed_at=now)
+    else:
+        delay = retry_delay(delivery.attempts, getattr(error, 'retry_after', None))
+        changes.update(
+            state='pending',
+            available_at=now + timedelta(seconds=delay),
+        )
+    WebhookDelivery.objects.filter(id=delivery.id).update(**changes)
+    if changes['state'] == 'dead' and delivery.internal:
+        job_dead_lettered(delivery, now)
+    return changes['state']
+
+
+def job_dead_lettered(delivery, now):
+    # A publication left pending would block publishing again for good
+    if delivery.action == RESULTS_PUBLISH_ACTION:
+        ResultPublication.objects.filter(
+            id=json.loads(delivery.payload)['publication_id'],
+        ).update(state='failed', finished_at=now)
+
+
+def process_delivery(delivery, handler):
+    try:
+        handler(json.loads(delivery.payload), delivery.host)
+    except Exception as error:
+        logger.exception(error)
+        fail_delivery(delivery, error)
+        return False
+    complete_delivery(delivery)
+    return True
+
+
+def process_delivery_batch(deliveries, handler):
+    # handler takes the whole batch and returns {delivery id: error}
+    try:
+        errors = handler(deliveries)
+    except Exception as error:
+        logger.exception(error)
+        errors = {delivery.id: error for delivery in deliveries}
+    for delivery in deliveries:
+        if delivery.id in errors:
+            fail_delivery(delivery, errors[delivery.id])
+    complete_deliveries([
+        delivery for delivery in deliveries if delivery.id not in errors
+    ])
+    return len(deliveries) - len(errors)
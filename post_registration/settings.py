@@ -125,6 +125,33 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/1.11/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'eventbrite': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'eventbrite_cache',
+        'TIMEOUT': int(os.environ.get('EVENT_CACHE_TTL', 300)),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('EVENT_CACHE_MAX_ENTRIES', 5000)),
+        },
+    },
+    # Locks and metrics shared by the workers, kept apart from the event
+    # payloads so culling the event cache never drops them
+    'control': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'control_cache',
+        'TIMEOUT': None,
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('CONTROL_CACHE_MAX_ENTRIES', 100000)),
+        },
+    },
+}
+
 # User substitution
 # https://docs.djangoproject.com/en/1.11/topics/auth/customizing/#auth-custom-user
 
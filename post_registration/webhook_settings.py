@@ -0,0 +1,11 @@
+"""
+Settings for the webhook-only process (post_registration.webhook_wsgi).
+
+Eventbrite webhooks need no sessions, authentication, CSRF or messages,
+so the middleware chain is empty and only the ingestion URL is routed.
+"""
+from .settings import *  # noqa: F401,F403
+
+MIDDLEWARE = []
+
+ROOT_URLCONF = 'post_registration.webhook_urls'
@@ -0,0 +1,11 @@
+from django.conf.urls import url
+
+from documentsManager.utils import accept_webhook
+
+urlpatterns = [
+    url(
+        r'^webhook-point/',
+        accept_webhook,
+        name='accept_webhook'
+    ),
+]
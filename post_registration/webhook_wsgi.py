@@ -0,0 +1,13 @@
+"""
+WSGI config for the webhook ingestion process.
+
+Serves only /webhook-point/ with an empty middleware chain, so it can be
+scaled apart from the organizer UI served by post_registration.wsgi.
+"""
+
+import os
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "post_registration.webhook_settings")
+
+application = get_wsgi_application()